@@ -0,0 +1,177 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cnn_dense_model.physical_setup import parse_lines, setup_dtype
+from cnn_model.sample_store import save_json
+
+# Configuration
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK_DIR = os.path.join(HERE, 'input')           # LED_Matrix_*.xlsx workbooks
+CACHE_DIR = os.path.join(HERE, 'workbook_cache')     # Per-workbook arrays + the stacked dataset
+NUM_WORKERS = os.cpu_count() or 1
+X_SHAPE = (25, 25)   # Average sheet B2:Z26, LED x PD
+AVERAGE_SHEET = 'Average'
+CACHE_VERSION = 3
+
+#
+# Per-workbook cache: <sha1>.v<CACHE_VERSION>.npz; manifest.json maps path -> mtime,
+# size and sha1 so unchanged workbooks are not re-hashed.
+#
+
+
+def read_workbook(path):
+    """
+    (sheets (S, 25, 25) float32, sheet names, PhysicalSetup) from one workbook: every
+    LED x PD sheet (the repeats '1'..'5' and 'Average') plus the parsed setup.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        names = [name for name in wb.sheetnames if name != 'Physical_Setup']
+        sheets = []
+        for name in names:
+            rows = wb[name].iter_rows(min_row=2, max_row=26, min_col=2, max_col=26, values_only=True)
+            matrix = np.array([list(row) for row in rows], dtype=np.float32)
+            if matrix.shape != X_SHAPE:
+                raise ValueError(f"sheet {name} shape incorrect: {matrix.shape}")
+            sheets.append(matrix)
+        if AVERAGE_SHEET not in names:
+            raise ValueError(f"no {AVERAGE_SHEET} sheet")
+        column_a = [row[0] for row in wb['Physical_Setup'].iter_rows(max_col=1, values_only=True) if row]
+    finally:
+        wb.close()
+    return np.stack(sheets), names, parse_lines(column_a)
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_entry(path):
+    """Pool worker: parse one workbook, returning (sheets, sheet names, setup record) or the error text."""
+    try:
+        sheets, names, setup = read_workbook(path)
+        return sheets, names, setup.to_record()
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest['files'] if manifest.get('version') == CACHE_VERSION else {}
+
+
+def save_npy(path, array):
+    """np.save through a temp file and os.replace, so an interrupted run never leaves a truncated array."""
+    tmp = path + '.tmp.npy'
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _entry_path(cache_dir, digest):
+    return os.path.join(cache_dir, f'{digest}.v{CACHE_VERSION}.npz')
+
+
+def ingest(folder=WORKBOOK_DIR, cache_dir=CACHE_DIR, workers=NUM_WORKERS):
+    """
+    Parse every LED_Matrix_*.xlsx in folder (only new or changed ones are actually
+    opened) and write the stacked dataset to cache_dir.
+    Returns (X (N, 25, 25), y (N, 15, 13), workbook names); X and y are memory-mapped.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    paths = sorted(glob.glob(os.path.join(folder, 'LED_Matrix_*.xlsx')))
+
+    entries = {}
+    for path in paths:
+        stat = os.stat(path)
+        known = manifest.get(os.path.abspath(path))
+        if known and known['mtime'] == stat.st_mtime and known['size'] == stat.st_size:
+            digest = known['sha1']
+        else:
+            digest = file_hash(path)
+        entries[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digest}
+
+    todo = [path for path, entry in entries.items()
+            if not os.path.exists(_entry_path(cache_dir, entry['sha1']))]
+    if todo:
+        print(f"📖 Parsing {len(todo)} of {len(paths)} workbooks with {min(workers, len(todo))} worker(s)...")
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                results = list(pool.map(_parse_entry, todo, chunksize=4))
+        else:
+            results = [_parse_entry(path) for path in todo]
+        for path, result in zip(todo, results):
+            if isinstance(result, str):
+                print(f"[ERROR] {path}: {result}")
+                del entries[path]
+                continue
+            sheets, sheet_names, setup = result
+            np.savez(_entry_path(cache_dir, entries[path]['sha1']), sheets=sheets, sheet_names=sheet_names,
+                     setup=setup)
+
+    names = list(entries)
+    X = np.zeros((len(names),) + X_SHAPE, dtype=np.float32)
+    setups = np.zeros(len(names), dtype=setup_dtype())
+    sheets, sheet_index = [], []
+    for i, path in enumerate(names):
+        with np.load(_entry_path(cache_dir, entries[path]['sha1'])) as data:
+            sheet_names = data['sheet_names'].tolist()
+            X[i] = data['sheets'][sheet_names.index(AVERAGE_SHEET)]
+            setups[i] = data['setup']
+            sheets.append(data['sheets'])
+            sheet_index += [[i, name] for name in sheet_names]
+
+    save_npy(os.path.join(cache_dir, 'X.npy'), X)
+    save_npy(os.path.join(cache_dir, 'y.npy'), np.ascontiguousarray(setups['grid']))
+    save_npy(os.path.join(cache_dir, 'setup.npy'), setups)
+    save_npy(os.path.join(cache_dir, 'sheets.npy'), np.concatenate(sheets) if sheets else np.zeros((0,) + X_SHAPE))
+    save_json(os.path.join(cache_dir, 'sheets.json'), sheet_index)
+    save_json(os.path.join(cache_dir, 'files.json'), [os.path.basename(path) for path in names])
+    save_json(os.path.join(cache_dir, 'manifest.json'),
+               {'version': CACHE_VERSION, 'files': {os.path.abspath(p): e for p, e in entries.items()}})
+    return load_dataset(cache_dir)
+
+
+def load_dataset(cache_dir=CACHE_DIR, mmap_mode='r'):
+    """Stacked (X, y, workbook names) from the last ingest(); mmap_mode=None loads into memory."""
+    X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode=mmap_mode)
+    y = np.load(os.path.join(cache_dir, 'y.npy'), mmap_mode=mmap_mode)
+    with open(os.path.join(cache_dir, 'files.json')) as f:
+        names = json.load(f)
+    return X, y, names
+
+
+def load_sheets(cache_dir=CACHE_DIR, mmap_mode='r'):
+    """Every LED x PD sheet (M, 25, 25) and its [workbook index, sheet name] from the last ingest()."""
+    with open(os.path.join(cache_dir, 'sheets.json')) as f:
+        index = json.load(f)
+    return np.load(os.path.join(cache_dir, 'sheets.npy'), mmap_mode=mmap_mode), index
+
+
+def load_setups(cache_dir=CACHE_DIR, mmap_mode='r'):
+    """Physical_Setup table (setup_dtype rows) aligned with load_dataset()."""
+    return np.load(os.path.join(cache_dir, 'setup.npy'), mmap_mode=mmap_mode)
+
+
+# === Main: cold vs cached ingestion ===
+if __name__ == "__main__":
+    for label in ('first run', 're-run'):
+        start = time.perf_counter()
+        X, y, names = ingest()
+        print(f"✅ {label}: {len(names)} samples, X {X.shape}, y {y.shape} in {time.perf_counter() - start:.2f} s")
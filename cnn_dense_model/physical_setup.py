@@ -0,0 +1,199 @@
+import os
+import re
+import time
+
+import numpy as np
+
+# Configuration
+GRID_SHAPE = (15, 13)      # "Graph Grid 13x15": 15 rows of 13 cells
+LED_SHAPE = (5, 5)
+SECTION_TITLES = (         # Line prefix -> section key, in sheet order
+    ('Object Size', 'size'),
+    ('Graph Grid', 'grid'),
+    ('Method:', 'method'),
+    ('LED 5x5 position', 'leds'),
+    ('Grid occupancy', 'occupancy'),
+    ('Material Type', 'material'),
+    ('Shape:', 'shape'),
+    ('Additional Info', 'info'),
+)
+
+_GRID_ROW = re.compile(r'[01](?:\s+[01])*')
+_SIZE = re.compile(r'(Width|Length|Height)\s*=\s*([\d.]+)')
+_POSITION = re.compile(r'\(\s*([\d.]+)\s*,\s*([\d.]+)\s*\)')
+_DELAY = re.compile(r'Delay\s*=\s*([\d.]+)\s*([A-Za-z]*)')
+_COUNT = re.compile(r'(Num|N)\s*=\s*(\d+)')
+
+#
+# The Physical_Setup block (sheet column A, or Physical_Setup.txt) is split into its
+# titled sections, each parsed with a regex; validate_setup() rejects incomplete records.
+#
+
+
+class PhysicalSetup:
+    """One recording's setup: object, 15x13 object grid, LED positions, method and acquisition info."""
+
+    def __init__(self, width, length, height, grid, led_positions, method, occupancy,
+                 material=None, shape=None, delay=None, delay_unit='', num=None, n=None, notes=''):
+        self.width = width
+        self.length = length
+        self.height = height
+        self.grid = grid                    # (15, 13) uint8, 1 where the object covers the graph grid
+        self.led_positions = led_positions  # (5, 5, 2) float32 (row, column) on the graph grid
+        self.method = method                # 0: LED constant, 1: DON constant
+        self.occupancy = occupancy          # (5, 5) uint8, % of each LED cell covered by the object
+        self.material = material
+        self.shape = shape
+        self.delay = delay
+        self.delay_unit = delay_unit
+        self.num = num                      # readings per pair
+        self.n = n                          # grid side length
+        self.notes = notes
+
+    def to_record(self):
+        """The setup as one row of setup_dtype() (None -> NaN / -1 / '')."""
+        record = np.zeros((), dtype=setup_dtype())
+        for name in ('width', 'length', 'height', 'delay'):
+            record[name] = np.nan if getattr(self, name) is None else getattr(self, name)
+        for name in ('method', 'num', 'n'):
+            record[name] = -1 if getattr(self, name) is None else getattr(self, name)
+        for name in ('material', 'shape', 'delay_unit'):
+            record[name] = getattr(self, name) or ''
+        record['grid'] = self.grid
+        record['led_positions'] = self.led_positions
+        record['occupancy'] = self.occupancy
+        return record
+
+
+def setup_dtype():
+    """Fixed-size table row of the setup fields, for filtering thousands of recordings at once."""
+    return np.dtype([
+        ('width', '<f4'), ('length', '<f4'), ('height', '<f4'),
+        ('grid', 'u1', GRID_SHAPE),
+        ('led_positions', '<f4', LED_SHAPE + (2,)),
+        ('method', 'i1'),
+        ('occupancy', 'u1', LED_SHAPE),
+        ('material', 'U16'), ('shape', 'U16'),
+        ('delay', '<f4'), ('delay_unit', 'U16'),
+        ('num', '<i4'), ('n', '<i4'),
+    ])
+
+
+def _sections(lines):
+    """Split the block into {section key: [stripped lines after its title]}."""
+    sections = {}
+    current = None
+    for line in lines:
+        text = '' if line is None else str(line).strip()
+        for prefix, key in SECTION_TITLES:
+            if text.startswith(prefix):
+                current = key
+                sections[key] = []
+                break
+        else:
+            if current is not None and text:
+                sections[current].append(text)
+    return sections
+
+
+def _text_value(lines):
+    value = lines[0] if lines else None
+    return None if value in (None, 'None') else value
+
+
+def parse_lines(lines, validate=True):
+    """PhysicalSetup from the block's lines (sheet column A cells or text-file lines)."""
+    sections = _sections(lines)
+
+    size = dict((key.lower(), float(value)) for key, value in _SIZE.findall(' '.join(sections.get('size', []))))
+    grid_rows = [row for row in (line.split() for line in sections.get('grid', []) if _GRID_ROW.fullmatch(line))
+                 if len(row) == GRID_SHAPE[1]]
+    grid = np.array(grid_rows, dtype=np.uint8) if grid_rows else np.zeros((0, GRID_SHAPE[1]), dtype=np.uint8)
+    method = next((int(line) for line in sections.get('method', []) if line.isdigit()), None)
+    positions = _POSITION.findall(' '.join(sections.get('leds', [])))
+    led_positions = np.array(positions, dtype=np.float32).reshape(-1, 2)
+    occupancy_rows = [row for row in map(str.split, sections.get('occupancy', []))
+                      if len(row) == LED_SHAPE[1] and all(cell.isdigit() for cell in row)]
+    occupancy = np.array(occupancy_rows, dtype=np.uint8) if occupancy_rows else np.zeros((0, LED_SHAPE[1]), np.uint8)
+
+    info = sections.get('info', [])
+    delay = next(filter(None, map(_DELAY.match, info)), None)
+    counts = dict(match.groups() for match in map(_COUNT.match, info) if match)
+    notes = ' '.join(line for line in info if not (_DELAY.match(line) or _COUNT.match(line)))
+
+    if len(led_positions) == np.prod(LED_SHAPE):
+        led_positions = led_positions.reshape(LED_SHAPE + (2,))
+    setup = PhysicalSetup(
+        size.get('width'), size.get('length'), size.get('height'), grid, led_positions, method, occupancy,
+        material=_text_value(sections.get('material')), shape=_text_value(sections.get('shape')),
+        delay=float(delay.group(1)) if delay else None, delay_unit=delay.group(2) if delay else '',
+        num=int(counts['Num']) if 'Num' in counts else None, n=int(counts['N']) if 'N' in counts else None,
+        notes=notes)
+    if validate:
+        validate_setup(setup)
+    return setup
+
+
+def validate_setup(setup):
+    """Raise ValueError listing everything that is missing or out of range."""
+    problems = []
+    if setup.grid.shape != GRID_SHAPE:
+        problems.append(f"object grid is {setup.grid.shape}, expected {GRID_SHAPE}")
+    if setup.led_positions.shape != LED_SHAPE + (2,):
+        problems.append(f"{len(setup.led_positions.reshape(-1, 2))} LED positions, expected {np.prod(LED_SHAPE)}")
+    if setup.occupancy.shape != LED_SHAPE:
+        problems.append(f"occupancy is {setup.occupancy.shape}, expected {LED_SHAPE}")
+    elif setup.occupancy.max() > 100:
+        problems.append("occupancy above 100 %")
+    if setup.method not in (0, 1):
+        problems.append(f"method {setup.method!r} is not 0 or 1")
+    for name in ('width', 'length', 'height'):
+        value = getattr(setup, name)
+        if value is None or value < 0:
+            problems.append(f"object {name} missing or negative")
+    if problems:
+        raise ValueError('; '.join(problems))
+
+
+def read_sheet_lines(path):
+    """Column A of a workbook's Physical_Setup sheet (read-only streaming mode)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [row[0] for row in wb['Physical_Setup'].iter_rows(max_col=1, values_only=True) if row]
+    finally:
+        wb.close()
+
+
+def parse_setup(path, validate=True):
+    """PhysicalSetup from an LED_Matrix_*.xlsx workbook or a Physical_Setup .txt file."""
+    if path.endswith('.xlsx'):
+        lines = read_sheet_lines(path)
+    else:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    return parse_lines(lines, validate)
+
+
+def setup_table(setups):
+    """Stack PhysicalSetup objects into one setup_dtype() array."""
+    table = np.zeros(len(setups), dtype=setup_dtype())
+    for i, setup in enumerate(setups):
+        table[i] = setup.to_record()
+    return table
+
+
+# === Main: parse the MATLAB pipeline's setup files and time bulk parsing ===
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(here, '..', 'matlabPipeline', 'Physical_Setup.txt')
+    setup = parse_setup(path)
+    print(f"📐 {setup.width} x {setup.length} x {setup.height} cm {setup.material} {setup.shape}, "
+          f"method {setup.method}, {setup.grid.sum()} grid cells covered, delay {setup.delay} {setup.delay_unit}")
+    with open(path) as f:
+        lines = f.read().splitlines()
+    start = time.perf_counter()
+    table = setup_table([parse_lines(lines) for _ in range(1000)])
+    print(f"⏱️ 1000 setups parsed into a {table.dtype.itemsize}-byte/row table in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
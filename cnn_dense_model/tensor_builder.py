@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from cnn_dense_model.excel_ingest import CACHE_DIR, WORKBOOK_DIR, ingest, load_setups, load_sheets, save_npy
+from cnn_model.sample_store import save_json
+
+# Configuration
+ADC_FULL_SCALE = 1024.0   # Data_Image_Mask.m: image = uint8(255 * value / 1024)
+MASK_SHAPE = (25, 25)     # Network output, same grid as the input matrix
+# Data_Image_Mask.m mask geometry: each of the 15x13 grid cells becomes a 26 x 30 pixel
+# block (390 x 390), then 3 pixels are cropped from every side (384 x 384).
+MASK_CELL = (26, 30)
+MASK_CROP = 3
+
+#
+# Inputs are sheet values / ADC_FULL_SCALE; each mask pixel is the fraction of its area
+# covered by the object grid in Data_Image_Mask.m's 384 px geometry.
+#
+
+
+def overlap_weights(num_out, num_cells, cell, crop):
+    """(num_out, num_cells): fraction of each output pixel's span covered by each grid cell."""
+    size = num_cells * cell - 2 * crop
+    edges = np.linspace(0, size, num_out + 1) + crop
+    cell_edges = np.arange(num_cells + 1) * cell
+    low = np.maximum(edges[:-1, None], cell_edges[None, :-1])
+    high = np.minimum(edges[1:, None], cell_edges[None, 1:])
+    return np.clip(high - low, 0, None) / np.diff(edges)[:, None]
+
+
+def grids_to_masks(grids, mask_shape=MASK_SHAPE):
+    """(N, 15, 13) object grids -> (N, *mask_shape) float32 area-coverage masks."""
+    grids = np.asarray(grids, dtype=np.float32)
+    rows = overlap_weights(mask_shape[0], grids.shape[1], MASK_CELL[0], MASK_CROP)
+    cols = overlap_weights(mask_shape[1], grids.shape[2], MASK_CELL[1], MASK_CROP)
+    return np.einsum('ir,nrc,jc->nij', rows, grids, cols).astype(np.float32)
+
+
+def build_tensors(folder=WORKBOOK_DIR, cache_dir=CACHE_DIR, sheets=None):
+    """
+    Input and mask tensors straight from the workbooks (via the ingest cache), one sample
+    per sheet like the PNG dataset ('<workbook>_<sheet>'); sheets=None keeps every sheet,
+    e.g. sheets=('Average',) keeps one sample per workbook.
+    Writes tensors_X.npy (N, 25, 25, 1), tensors_Y.npy (N, 25, 25, 1) and tensors.json to
+    cache_dir in one batch and returns them memory-mapped with the sample names.
+    """
+    _, _, names = ingest(folder, cache_dir)
+    values, index = load_sheets(cache_dir)
+    masks = grids_to_masks(load_setups(cache_dir)['grid'])
+
+    keep = [i for i, (_, sheet) in enumerate(index) if sheets is None or sheet in sheets]
+    workbooks = np.array([index[i][0] for i in keep], dtype=int)
+    X = (np.asarray(values[keep], dtype=np.float32) / ADC_FULL_SCALE)[..., None]
+    Y = masks[workbooks][..., None]
+    samples = [f"{os.path.splitext(names[index[i][0]])[0]}_{index[i][1]}" for i in keep]
+
+    # tensors.json goes last: without it load_tensors fails instead of pairing X and Y from different runs
+    names_path = os.path.join(cache_dir, 'tensors.json')
+    if os.path.exists(names_path):
+        os.remove(names_path)
+    save_npy(os.path.join(cache_dir, 'tensors_X.npy'), X)
+    save_npy(os.path.join(cache_dir, 'tensors_Y.npy'), Y)
+    save_json(names_path, samples)
+    return load_tensors(cache_dir)
+
+
+def load_tensors(cache_dir=CACHE_DIR, mmap_mode='r'):
+    """(X, Y, sample names) written by the last build_tensors()."""
+    X = np.load(os.path.join(cache_dir, 'tensors_X.npy'), mmap_mode=mmap_mode)
+    Y = np.load(os.path.join(cache_dir, 'tensors_Y.npy'), mmap_mode=mmap_mode)
+    with open(os.path.join(cache_dir, 'tensors.json')) as f:
+        samples = json.load(f)
+    return X, Y, samples
+
+
+# === Main: build, and compare with the PNG round trip where the PNGs are available ===
+if __name__ == "__main__":
+    start = time.perf_counter()
+    X, Y, samples = build_tensors()
+    print(f"✅ {len(samples)} samples, X {X.shape}, Y {Y.shape} in {time.perf_counter() - start:.2f} s")
+
+    image_dir = os.path.join(os.path.dirname(WORKBOOK_DIR), '..', 'dataset', 'image_mask_data', 'Image')
+    if os.path.isdir(image_dir):
+        from PIL import Image
+
+        errors = []
+        for i, sample in enumerate(samples):
+            path = os.path.join(image_dir, sample + '.png')
+            if os.path.exists(path):
+                png = np.array(Image.open(path).convert('L').resize((25, 25)), dtype=np.float32) / 255.0
+                errors.append(np.abs(png - X[i, ..., 0]).mean())
+        if errors:
+            print(f"📉 PNG round trip vs direct tensors: mean abs error {np.mean(errors):.4f} "
+                  f"({np.mean(errors) * ADC_FULL_SCALE:.1f} ADC counts) over {len(errors)} images")
@@ -1,4 +1,5 @@
 #include "pin_defs.h"
+#include <util/crc16.h>
 
 // Shift register pins
 const int RESET_PIN = 2;
@@ -16,6 +17,19 @@ int selected_led_col = -1;
 int selected_pd_row = -1;
 int selected_pd_col = -1;
 
+// Grid size. Up to 9x9 cells are addressed as LOXrc / DONrc; larger grids also accept
+// LOXrrcc / DONrrcc (zero-padded). The shift-register bit mapping below is for the 5x5 board.
+const int NUM_ROWS = 5;
+const int NUM_COLS = 5;
+const int NUM_CELLS = NUM_ROWS * NUM_COLS;
+
+// Binary row frame (GETROW): a5 5a 'R' seq(u16) led(u16) n(u16) reads(u8) n x u16 crc16(u16), little-endian
+const int ADC_READS = 5;
+const int ROW_PD_SETTLE_US = 1000;
+const int FRAME_HEADER = 10;
+uint8_t row_frame[FRAME_HEADER + 2 * NUM_CELLS + 2];
+unsigned int row_seq = 0;
+
 #define SET_BIT_HIGH(var, bit) (var |= (1UL << bit))
 #define SET_BIT_LOW(var, bit) (var &= ~(1UL << bit))
 
@@ -39,16 +53,14 @@ void loop() {
     command.trim();
 
     if (command.startsWith("LOX")) {
-      selected_led_row = command.charAt(3) - '0';
-      selected_led_col = command.charAt(4) - '0';
-      if (validIndex(selected_led_row) && validIndex(selected_led_col)) {
+      parseAddress(command, selected_led_row, selected_led_col);
+      if (validIndex(selected_led_row, NUM_ROWS) && validIndex(selected_led_col, NUM_COLS)) {
         selectLED(selected_led_row, selected_led_col);
       }
     }
     else if (command.startsWith("DON")) {
-      selected_pd_row = command.charAt(3) - '0';
-      selected_pd_col = command.charAt(4) - '0';
-      if (validIndex(selected_pd_row) && validIndex(selected_pd_col)) {
+      parseAddress(command, selected_pd_row, selected_pd_col);
+      if (validIndex(selected_pd_row, NUM_ROWS) && validIndex(selected_pd_col, NUM_COLS)) {
         selectPhotodiode(selected_pd_row, selected_pd_col);
       }
     }
@@ -74,13 +86,70 @@ void loop() {
       Serial.print(avg, 2);
       Serial.println("}");
     }
+    else if (command == "GETROW") {
+      sendRowFrame();
+    }
 
     shiftOutState();
   }
 }
 
-bool validIndex(int i) {
-  return i >= 1 && i <= 5;
+bool validIndex(int i, int n) {
+  return i >= 1 && i <= n;
+}
+
+// "LOX23" -> (2, 3); "LOX1016" -> (10, 16)
+void parseAddress(const String &cmd, int &row, int &col) {
+  if (cmd.length() == 7) {
+    row = cmd.substring(3, 5).toInt();
+    col = cmd.substring(5, 7).toInt();
+  } else {
+    row = cmd.charAt(3) - '0';
+    col = cmd.charAt(4) - '0';
+  }
+}
+
+unsigned int readAdcSum() {
+  unsigned int sum = 0;
+  for (int i = 0; i < ADC_READS; i++) {
+    sum += analogRead(A0);
+    delay(5);
+  }
+  return sum;
+}
+
+// Sweep every photodiode under the selected LED and send one CRC-checked binary frame
+void sendRowFrame() {
+  int n = FRAME_HEADER;
+  row_frame[0] = 0xA5;
+  row_frame[1] = 0x5A;
+  row_frame[2] = 'R';
+  row_frame[3] = row_seq & 0xFF;
+  row_frame[4] = row_seq >> 8;
+  unsigned int led = validIndex(selected_led_row, NUM_ROWS) ? (selected_led_row - 1) * NUM_COLS + selected_led_col - 1 : 0xFFFF;
+  row_frame[5] = led & 0xFF;
+  row_frame[6] = led >> 8;
+  row_frame[7] = NUM_CELLS & 0xFF;
+  row_frame[8] = NUM_CELLS >> 8;
+  row_frame[9] = ADC_READS;
+  for (int pd = 0; pd < NUM_CELLS; pd++) {
+    selected_pd_row = pd / NUM_COLS + 1;
+    selected_pd_col = pd % NUM_COLS + 1;
+    selectPhotodiode(selected_pd_row, selected_pd_col);
+    shiftOutState();
+    delayMicroseconds(ROW_PD_SETTLE_US);
+    unsigned int sum = readAdcSum();
+    row_frame[n++] = sum & 0xFF;
+    row_frame[n++] = sum >> 8;
+  }
+  uint16_t crc = 0xFFFF;
+  for (int i = 0; i < n; i++) {
+    crc = _crc_xmodem_update(crc, row_frame[i]);
+  }
+  row_frame[n++] = crc & 0xFF;
+  row_frame[n++] = crc >> 8;
+  Serial.write(row_frame, n);
+  row_seq++;
 }
 
 void selectLED(int row, int col) {
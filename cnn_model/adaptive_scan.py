@@ -0,0 +1,109 @@
+import os
+import time
+
+import numpy as np
+
+from cnn_model.scan_engine import FullFrame, diagonal_pairs, scan_full_matrix, scan_pairs
+
+# Configuration
+COM_PORT = 'COM3'
+BACKGROUND_PATH = 'background_matrix.npz'  # Full LED x PD scan of the empty rig
+HOT_THRESHOLD = 20.0    # Diagonal change (ADC counts) against the background that marks an object cell
+REFINE_RADIUS = 1       # Cells around each hot cell whose LED/PD pairs are measured in the fine pass
+
+
+class BackgroundMatrix:
+    """Cached full (LEDs, PDs) matrix of the scene without an object."""
+
+    def __init__(self, values, captured_at):
+        self.values = np.asarray(values, dtype=np.float32)
+        self.captured_at = captured_at
+
+    @classmethod
+    def capture(cls, session):
+        frame = scan_full_matrix(session)
+        return cls(frame.values, frame.started_at)
+
+    def save(self, path=BACKGROUND_PATH):
+        np.savez(path, values=self.values, captured_at=self.captured_at)
+
+    @classmethod
+    def load(cls, path=BACKGROUND_PATH):
+        data = np.load(path)
+        return cls(data['values'], float(data['captured_at']))
+
+
+def load_or_capture_background(session, path=BACKGROUND_PATH):
+    """Reuse the saved background scan, or take one now (rig must be empty) and save it."""
+    if os.path.exists(path):
+        return BackgroundMatrix.load(path)
+    print("📷 No background matrix yet - scanning the empty rig...")
+    background = BackgroundMatrix.capture(session)
+    background.save(path)
+    return background
+
+
+def neighbourhood(cells, num_rows, num_cols, radius=REFINE_RADIUS):
+    """All cell indices within `radius` rows/cols of any of the given cells."""
+    rows, cols = np.divmod(np.arange(num_rows * num_cols), num_cols)
+    hot_rows, hot_cols = np.divmod(np.asarray(cells), num_cols)
+    near = (np.abs(rows[:, None] - hot_rows[None, :]) <= radius) & (np.abs(cols[:, None] - hot_cols[None, :]) <= radius)
+    return np.nonzero(near.any(axis=1))[0]
+
+
+def coarse_to_fine_scan(session, background, hot_threshold=HOT_THRESHOLD, radius=REFINE_RADIUS):
+    """
+    Two-pass adaptive scan producing a complete (LEDs, PDs) FullFrame, e.g. the (25, 25)
+    input of the cnn_dense_model network.
+
+    1. Coarse: the local-LED diagonal (one pair per cell) finds the cells whose reading
+       moved more than hot_threshold away from the background.
+    2. Fine: every LED/PD pair among the cells around those hot cells is measured.
+
+    All other pairs are taken from the background matrix.
+    Returns (frame, measured mask of the pairs read in this scan, hot cell indices).
+    """
+    num_rows, num_cols = session.num_rows, session.num_cols
+    num_cells = num_rows * num_cols
+    wall_start = time.time()
+    perf_start = time.perf_counter()
+
+    values = background.values.copy()
+    timestamps = np.full(values.shape, background.captured_at)
+    quality = np.zeros(values.shape, dtype=np.uint8)
+    measured = np.zeros(values.shape, dtype=bool)
+
+    probe = diagonal_pairs(num_cells)
+    coarse, coarse_quality = scan_pairs(session, probe)
+    coarse_time = time.time()
+    values[probe[:, 0], probe[:, 1]] = coarse
+    quality[probe[:, 0], probe[:, 1]] = coarse_quality
+    timestamps[probe[:, 0], probe[:, 1]] = coarse_time
+    measured[probe[:, 0], probe[:, 1]] = True
+
+    hot = np.nonzero(np.abs(coarse - np.diag(background.values)) > hot_threshold)[0]
+    if hot.size:
+        region = neighbourhood(hot, num_rows, num_cols, radius)
+        leds, pds = np.meshgrid(region, region, indexing='ij')
+        pairs = np.stack([leds.ravel(), pds.ravel()], axis=1)
+        pairs = pairs[~measured[pairs[:, 0], pairs[:, 1]]]
+        fine, fine_quality = scan_pairs(session, pairs)
+        values[pairs[:, 0], pairs[:, 1]] = fine
+        quality[pairs[:, 0], pairs[:, 1]] = fine_quality
+        timestamps[pairs[:, 0], pairs[:, 1]] = time.time()
+        measured[pairs[:, 0], pairs[:, 1]] = True
+
+    frame = FullFrame(values, timestamps, wall_start, time.perf_counter() - perf_start, quality)
+    return frame, measured, hot
+
+
+# === Main ===
+if __name__ == "__main__":
+    from cnn_model.sensor_session import SensorSession
+
+    with SensorSession(COM_PORT) as session:
+        background = load_or_capture_background(session)
+        input("➡️ Place the object and press Enter...")
+        frame, measured, hot = coarse_to_fine_scan(session, background)
+    print(f"🎯 Hot cells: {hot.tolist()}")
+    print(f"⏱️ Adaptive scan: {frame.duration:.2f} s, measured {measured.sum()} of {measured.size} pairs")
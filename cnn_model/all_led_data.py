@@ -1,50 +1,25 @@
-import serial
-import time
 import numpy as np
 import matplotlib.pyplot as plt
 
+from cnn_model.sensor_session import borrow_session
+
 # Configuration
-COM_PORT = 'COM3'  # Set to your serial port
+COM_PORT = 'COM3'  # Set to your serial port ('VIRTUAL:legacy' for the simulated board)
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-READ_DELAY = 0.15  # Delay between LED ON, read, and LED OFF
 
-def read_photodiodes_with_local_led():
+def read_photodiodes_with_local_led(port=COM_PORT, session=None):
     """
     For each PD(x,y), turn on LED(x,y), read value, turn off LED.
     Returns a 5x5 matrix of values.
     """
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    matrix = np.zeros((NUM_ROWS, NUM_COLS))
+    with borrow_session(session, port, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        matrix = sensor.scan_diagonal()
 
     for row in range(NUM_ROWS):
         for col in range(NUM_COLS):
-            # Turn on corresponding LED
-            led_cmd = f'LOX{row+1}{col+1}\n'.encode()
-            ser.write(led_cmd)
-            time.sleep(READ_DELAY)
-
-            # Read corresponding photodiode
-            diode_cmd = f'DON{row+1}{col+1}\n'.encode()
-            ser.write(diode_cmd)
-            line = ser.readline().decode().strip()
-            print(f"PD({row+1},{col+1}): {line}")
-
-            try:
-                val = float(line.split(',')[-1])
-            except:
-                val = 0.0
-
-            matrix[row, col] = val
-
-            # Turn off all LEDs
-            ser.write(b'LAF\n')
-            time.sleep(READ_DELAY)
-
-    ser.close()
+            print(f"PD({row+1},{col+1}): {matrix[row, col]}")
     return matrix
 
 def show_heatmap(matrix):
@@ -0,0 +1,117 @@
+import binascii
+import struct
+import time
+
+import numpy as np
+
+# Configuration
+FRAME_MAGIC = b'\xa5\x5a'
+FRAME_TYPE_ROW = ord('R')   # One LED, every photodiode
+HEADER = struct.Struct('<2sBHHHB')  # magic, type, seq, led index, value count, reads per value
+CRC = struct.Struct('<H')
+CRC_INIT = 0xFFFF           # CRC-16/CCITT-FALSE, same as _crc_xmodem_update() seeded with 0xFFFF
+ROW_TIMEOUT = 0.5           # Slack on top of the sweep itself
+ROW_READ_TIME = 0.03        # GETROW spends ~26 ms per photodiode on the board
+BINARY_COMMANDS = ('GETROW',)
+
+#
+# Row frame (little-endian, as the AVR stores it):
+#
+#   a5 5a | 'R' | seq u16 | led u16 | n u16 | reads u8 | n x u16 ADC sums | crc16 u16
+#
+# Each value is the sum of `reads` analogRead()s, so value / reads is exactly the
+# average the JSON firmware prints with two decimals.
+#
+
+
+def frame_size(num_values):
+    return HEADER.size + 2 * num_values + CRC.size
+
+
+def row_timeout(num_values):
+    """How long to wait for a GETROW frame with num_values photodiodes."""
+    return ROW_TIMEOUT + num_values * ROW_READ_TIME
+
+
+def encode_row_frame(seq, led, sums, reads):
+    """Build one row frame (used by the virtual board; the firmware does the same in C)."""
+    sums = np.asarray(sums, dtype='<u2')
+    body = HEADER.pack(FRAME_MAGIC, FRAME_TYPE_ROW, seq & 0xFFFF, led, len(sums), reads) + sums.tobytes()
+    return body + CRC.pack(binascii.crc_hqx(body, CRC_INIT))
+
+
+class FrameDecoder:
+    """
+    Reads row frames off a serial port and decodes them with np.frombuffer straight into
+    the caller's frame array. Keeps byte, timing, CRC and sequence-gap statistics.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_in = 0
+        self.crc_errors = 0
+        self.seq_gaps = 0
+        self.decode_time = 0.0
+        self.last_seq = None
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes_in / self.frames if self.frames else 0.0
+
+    @property
+    def decode_time_per_frame(self):
+        return self.decode_time / self.frames if self.frames else 0.0
+
+    def read(self, ser, deadline=None):
+        """
+        Return the raw bytes of the next frame on ser, or None on timeout. With a deadline
+        (time.perf_counter() value) every ser.read waits only for the time that is left.
+        """
+        def read_bytes(size):
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return b''
+                ser.timeout = remaining
+            return ser.read(size)
+
+        window = read_bytes(len(FRAME_MAGIC))
+        while window != FRAME_MAGIC:
+            byte = read_bytes(1)
+            if not byte:
+                return None
+            window = window[1:] + byte  # resync after garbage or a stray text line
+        rest = read_bytes(HEADER.size - len(FRAME_MAGIC))
+        if len(rest) < HEADER.size - len(FRAME_MAGIC):
+            return None
+        num_values = HEADER.unpack(window + rest)[4]
+        tail = read_bytes(2 * num_values + CRC.size)
+        if len(tail) < 2 * num_values + CRC.size:
+            return None
+        return window + rest + tail
+
+    def decode(self, raw, out):
+        """
+        Check the CRC and write value / reads into out (a float row of the frame array).
+        Returns the LED index, or None if the frame is corrupt.
+        """
+        start = time.perf_counter()
+        if raw is None or CRC.unpack_from(raw, len(raw) - CRC.size)[0] != binascii.crc_hqx(raw[:-CRC.size], CRC_INIT):
+            self.crc_errors += raw is not None
+            return None
+        _, _, seq, led, num_values, reads = HEADER.unpack_from(raw)
+        sums = np.frombuffer(raw, dtype='<u2', count=num_values, offset=HEADER.size)
+        np.divide(sums, reads, out=out[:num_values], casting='unsafe')
+
+        if self.last_seq is not None and seq != (self.last_seq + 1) & 0xFFFF:
+            self.seq_gaps += 1
+        self.last_seq = seq
+        self.frames += 1
+        self.bytes_in += len(raw)
+        self.decode_time += time.perf_counter() - start
+        return led
+
+    def report(self):
+        return (f"{self.frames} frames, {self.bytes_per_frame:.0f} B/frame, "
+                f"{self.decode_time_per_frame * 1e6:.1f} µs decode, "
+                f"{self.crc_errors} CRC errors, {self.seq_gaps} sequence gaps")
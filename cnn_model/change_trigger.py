@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+
+from cnn_model.scan_engine import diagonal_pairs, scan_full_matrix, scan_pairs
+
+# Configuration
+COM_PORT = 'COM3'
+CHANGE_THRESHOLD = 15.0  # ADC counts a probe pair may move before the full matrix is rescanned
+MAX_FULL_AGE = 300.0     # Rescan anyway after this many seconds (None: only on change)
+RUN_SECONDS = 60.0
+
+
+class ChangeTriggeredScanner:
+    """
+    Probe-gated full scans for mostly static scenes.
+
+    Every cycle reads only the probe pairs (by default the 25-pair diagonal, ~1/25 of the
+    full matrix). The full LED x PD scan runs only if a probe pair moved more than
+    threshold away from its value in the cached full frame (or the cache is older than
+    max_age); otherwise the cached FullFrame is returned again.
+    """
+
+    def __init__(self, session, probe_pairs=None, threshold=CHANGE_THRESHOLD, max_age=MAX_FULL_AGE):
+        self.session = session
+        num_cells = session.num_rows * session.num_cols
+        self.probe_pairs = diagonal_pairs(num_cells) if probe_pairs is None else np.asarray(probe_pairs)
+        self.threshold = threshold
+        self.max_age = max_age
+        self.full = None
+        self.last_change = np.inf
+        self.probes = 0
+        self.full_scans = 0
+
+    def _changed(self, probe):
+        if self.full is None:
+            return True
+        if self.max_age is not None and time.time() - self.full.started_at > self.max_age:
+            return True
+        reference = self.full.values[self.probe_pairs[:, 0], self.probe_pairs[:, 1]]
+        difference = np.abs(probe - reference)
+        self.last_change = float(np.nanmax(difference)) if np.isfinite(difference).any() else np.inf
+        return self.last_change > self.threshold
+
+    def scan(self):
+        """Returns (FullFrame, rescanned) where rescanned tells whether the frame is new."""
+        probe, _ = scan_pairs(self.session, self.probe_pairs)
+        self.probes += 1
+        if not self._changed(probe):
+            return self.full, False
+        self.full = scan_full_matrix(self.session)
+        self.full_scans += 1
+        return self.full, True
+
+    def scan_values(self):
+        """Just the (LEDs, PDs) matrix, e.g. as the scan callable of an AcquisitionThread."""
+        return self.scan()[0].values
+
+
+# === Main: idle-scene cost of probe-gated scanning ===
+if __name__ == "__main__":
+    from cnn_model.sensor_session import SensorSession
+
+    with SensorSession(COM_PORT) as session:
+        scanner = ChangeTriggeredScanner(session)
+        start = time.perf_counter()
+        cycle_times = []
+        while time.perf_counter() - start < RUN_SECONDS:
+            t0 = time.perf_counter()
+            frame, rescanned = scanner.scan()
+            cycle_times.append(time.perf_counter() - t0)
+            print(f"{'🔄 full scan' if rescanned else '💤 cached'} - probe change {scanner.last_change:.1f}, "
+                  f"{cycle_times[-1]:.2f} s")
+        print(f"📊 {scanner.probes} probes, {scanner.full_scans} full scans, "
+              f"median cycle {np.median(cycle_times):.2f} s (a full scan takes {frame.duration:.2f} s)")
@@ -0,0 +1,134 @@
+import json
+import time
+from collections import deque
+
+from cnn_model.binary_frames import BINARY_COMMANDS, FrameDecoder
+from cnn_model.grid import split_address
+
+# Configuration
+MAX_IN_FLIGHT = 4     # 4 x 'DONrrcc\nGETVAL\n' = 60 bytes, inside the Arduino's 64-byte RX buffer
+REPLY_TIMEOUT = 0.5   # Per-command timeout for a reply line
+ADC_MAX = 1023.0      # 10-bit analogRead()
+
+
+def parse_value(line):
+    """
+    Extract the reading from a JSON GETVAL reply or a legacy 'LOXx,DONx,val' line.
+    Missing, garbled or out-of-range replies give NaN, never a plausible-looking 0.0.
+    """
+    try:
+        value = float(json.loads(line)['val']) if line.startswith('{') else float(line.split(',')[-1])
+    except (AttributeError, ValueError, KeyError, TypeError):
+        return float('nan')
+    return value if 0.0 <= value <= ADC_MAX else float('nan')
+
+
+class PendingReply:
+    """A command whose reply line has not been matched yet."""
+
+    __slots__ = ('cmd', 'pd', 'sent_at', 'deadline', 'received_at', 'line', 'done')
+
+    def __init__(self, cmd, pd, sent_at, deadline):
+        self.cmd = cmd
+        self.pd = pd              # 'row,col' the JSON reply must report, or None
+        self.sent_at = sent_at
+        self.deadline = deadline
+        self.received_at = None
+        self.line = None          # reply line (raw bytes for binary frames); None if timed out
+        self.done = False
+
+    @property
+    def timed_out(self):
+        return self.done and self.line is None
+
+
+class CommandPipeline:
+    """
+    Writes commands back-to-back and only waits where the firmware answers.
+
+    Commands without a reply (LOX/DON/LAF on the JSON firmware) are written immediately.
+    Commands with a reply (GETVAL, or everything on the legacy firmware) are tracked as
+    PendingReply objects and matched to reply lines in FIFO order. At most max_in_flight
+    replies are outstanding, so the firmware's RX buffer never overflows. Binary frame
+    commands (GETROW) are matched the same way, but read through a FrameDecoder.
+    """
+
+    def __init__(self, ser, firmware='json', max_in_flight=MAX_IN_FLIGHT, reply_timeout=REPLY_TIMEOUT):
+        self.ser = ser
+        self.firmware = firmware
+        self.max_in_flight = max_in_flight
+        self.reply_timeout = reply_timeout
+        self.in_flight = deque()
+        self.selected_pd = None
+        self.timeouts = 0
+        self.stale_lines = 0
+        self.decoder = FrameDecoder()
+
+    def expects_reply(self, cmd):
+        return self.firmware == 'legacy' or cmd == 'GETVAL' or cmd in BINARY_COMMANDS
+
+    def send(self, cmd, not_before=None, timeout=None):
+        """
+        Write one command, optionally not before perf_counter() time not_before (settle).
+        Returns a PendingReply if the firmware will answer, else None.
+        """
+        expects_reply = self.expects_reply(cmd)
+        if expects_reply:
+            while len(self.in_flight) >= self.max_in_flight:
+                self._receive_one()
+        if cmd.startswith('DON'):
+            self.selected_pd = '{},{}'.format(*split_address(cmd[3:]))
+
+        if not_before is not None:
+            time.sleep(max(not_before - time.perf_counter(), 0.0))
+        self.ser.write(f'{cmd}\n'.encode())
+        if not expects_reply:
+            return None
+
+        sent_at = time.perf_counter()
+        timeout = self.reply_timeout if timeout is None else timeout
+        pd = self.selected_pd if cmd == 'GETVAL' else None
+        pending = PendingReply(cmd, pd, sent_at, sent_at + timeout)
+        self.in_flight.append(pending)
+        return pending
+
+    def _receive_one(self):
+        """Match the next reply line (or binary frame) to the oldest pending command, or time it out."""
+        pending = self.in_flight[0]
+        if pending.cmd in BINARY_COMMANDS:
+            pending.line = self.decoder.read(self.ser, pending.deadline)
+            if pending.line is None:
+                self.timeouts += 1
+        else:
+            pending.line = self._read_line(pending)
+        pending.received_at = time.perf_counter()
+        pending.done = True
+        self.in_flight.popleft()
+
+    def _read_line(self, pending):
+        while True:
+            remaining = pending.deadline - time.perf_counter()
+            if remaining <= 0:
+                self.timeouts += 1
+                return None
+            self.ser.timeout = remaining
+            line = self.ser.readline().decode(errors='ignore').strip()
+            if not line:
+                self.timeouts += 1
+                return None
+            if (pending.pd is not None and line.startswith('{') and '"PD":' in line
+                    and f'"PD":"{pending.pd}"' not in line):
+                self.stale_lines += 1  # late reply to an earlier, timed-out command
+                continue
+            return line
+
+    def wait(self, pending):
+        """Block until pending has its reply (or timed out); return the line or None."""
+        while not pending.done:
+            self._receive_one()
+        return pending.line
+
+    def drain(self):
+        """Wait for every outstanding reply, e.g. before an LED change that must settle."""
+        while self.in_flight:
+            self._receive_one()
@@ -0,0 +1,157 @@
+import glob
+import os
+import time
+
+import numpy as np
+
+from cnn_model.scan_engine import QUALITY_FAILED, FullFrame, scan_pairs
+from cnn_model.virtual_device import RESPONSE_PATH, load_response_matrix
+
+# Configuration
+COM_PORT = 'COM3'
+TRAINING_PATH = RESPONSE_PATH   # .npz with the recorded Average sheets as X, or a folder of LED_Matrix_*.xlsx
+MODEL_PATH = 'compressive_model.npz'
+RANK = 30                 # Principal components kept from the recorded matrices
+NUM_PAIRS = 150           # K: LED/PD pairs measured per frame (of 625)
+READ_NOISE = 1.0          # ADC noise variance (counts^2) added to the truncation residual
+TEST_SHARE = 0.2          # Recordings held out when reporting reconstruction error
+EVAL_PAIRS = (10, 20, 40, 60, 100, 150, 250, 400)
+SEED = 0
+
+#
+# PCA prior on the full matrix; the posterior-mean map from the K selected pairs to all
+# cells is precomputed as one (cells, K) operator.
+#
+
+
+def load_training_matrices(path=TRAINING_PATH):
+    """(N, LEDs, PDs) stack of recorded Average sheets from the .npz dataset or a folder of workbooks."""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, 'LED_Matrix_*.xlsx')))
+        return np.stack([load_response_matrix(f) for f in files])
+    return np.asarray(np.load(path)['X'], dtype=np.float64)
+
+
+class CompressiveModel:
+    """PCA prior, the chosen (led, pd) pairs and the precomputed reconstruction operator."""
+
+    def __init__(self, mean, components, variances, noise, pairs):
+        self.mean = np.asarray(mean, dtype=np.float64)              # (cells,) flattened LED-major
+        self.components = np.asarray(components, dtype=np.float64)  # (rank, cells), orthonormal rows
+        self.variances = np.asarray(variances, dtype=np.float64)    # (rank,) per-component variance
+        self.noise = float(noise)
+        self.pairs = np.asarray(pairs, dtype=int)                    # (K, 2) LED-major
+        self.shape = (int(np.sqrt(self.mean.size)),) * 2
+        self.flat_pairs = np.ravel_multi_index((self.pairs[:, 0], self.pairs[:, 1]), self.shape)
+        self.operator = self._operator(self.flat_pairs)
+
+    @classmethod
+    def fit(cls, matrices, num_pairs=NUM_PAIRS, rank=RANK, read_noise=READ_NOISE):
+        data = np.asarray(matrices, dtype=np.float64).reshape(len(matrices), -1)
+        mean = data.mean(axis=0)
+        _, singular, vt = np.linalg.svd(data - mean, full_matrices=False)
+        variances = singular ** 2 / max(len(data) - 1, 1)
+        rank = min(rank, len(variances))
+        residual = variances[rank:].sum() / data.shape[1]   # truncated energy per cell
+        noise = residual + read_noise
+        flat = select_pairs(vt[:rank], variances[:rank], noise, num_pairs)
+        side = int(np.sqrt(data.shape[1]))
+        pairs = np.stack(np.unravel_index(np.sort(flat), (side, side)), axis=1)
+        return cls(mean, vt[:rank], variances[:rank], noise, pairs)
+
+    def _operator(self, flat_pairs):
+        """(cells, K) posterior-mean map from centred readings at flat_pairs to the full matrix."""
+        basis = self.components[:, flat_pairs].T                   # (K, rank)
+        prior = basis * self.variances                               # Phi Sigma
+        gram = prior @ basis.T + self.noise * np.eye(len(flat_pairs))
+        return self.components.T @ np.linalg.solve(gram, prior).T
+
+    def reconstruct(self, readings):
+        """
+        Full (LEDs, PDs) matrix from the K readings. Measured pairs keep their reading;
+        NaN readings are left out of the solve.
+        """
+        readings = np.asarray(readings, dtype=np.float64)
+        valid = ~np.isnan(readings)
+        flat_pairs = self.flat_pairs[valid]
+        operator = self.operator if valid.all() else self._operator(flat_pairs)
+        values = self.mean + operator @ (readings[valid] - self.mean[flat_pairs])
+        values[flat_pairs] = readings[valid]
+        return values.reshape(self.shape)
+
+    def save(self, path=MODEL_PATH):
+        np.savez(path, mean=self.mean, components=self.components, variances=self.variances,
+                 noise=self.noise, pairs=self.pairs)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        data = np.load(path)
+        return cls(data['mean'], data['components'], data['variances'], float(data['noise']), data['pairs'])
+
+
+def select_pairs(components, variances, noise, num_pairs):
+    """
+    Greedy variance-reduction choice of num_pairs flat cell indices: each step takes
+    the pair whose reading shrinks the trace of the coefficient posterior the most
+    (rank-one update, vectorised over all candidates).
+    """
+    covariance = np.diag(variances)
+    chosen = []
+    for _ in range(min(num_pairs, components.shape[1])):
+        projected = covariance @ components                           # (rank, cells)
+        gain = (projected ** 2).sum(axis=0) / ((components * projected).sum(axis=0) + noise)
+        gain[chosen] = -np.inf
+        best = int(np.argmax(gain))
+        chosen.append(best)
+        column = projected[:, best]
+        covariance -= np.outer(column, column) / (components[:, best] @ column + noise)
+    return np.array(chosen, dtype=int)
+
+
+def reconstruction_error(matrices, num_pairs_list=EVAL_PAIRS, rank=RANK, test_share=TEST_SHARE, seed=SEED):
+    """Held-out RMSE (ADC counts) of the reconstructed full matrix for each K: {K: rmse}."""
+    matrices = np.asarray(matrices, dtype=np.float64)
+    order = np.random.default_rng(seed).permutation(len(matrices))
+    num_test = max(1, int(len(matrices) * test_share))
+    test, train = matrices[order[:num_test]], matrices[order[num_test:]]
+    errors = {}
+    for num_pairs in num_pairs_list:
+        model = CompressiveModel.fit(train, num_pairs, rank)
+        flat = test.reshape(len(test), -1)
+        estimates = np.stack([model.reconstruct(sample[model.flat_pairs]) for sample in flat])
+        errors[num_pairs] = float(np.sqrt(np.mean((estimates.reshape(flat.shape) - flat) ** 2)))
+    return errors
+
+
+def compressive_scan(session, model, led_settle=None):
+    """
+    Measure only model.pairs and reconstruct the full (LEDs, PDs) FullFrame from them.
+    Reconstructed cells carry the scan's end time and QUALITY_OK; measured pairs whose
+    read failed are left out of the reconstruction and stay NaN / QUALITY_FAILED.
+    """
+    wall_start = time.time()
+    perf_start = time.perf_counter()
+    readings, quality = scan_pairs(session, model.pairs, led_settle)
+    leds, pds = model.pairs[:, 0], model.pairs[:, 1]
+    dark = session.dark.levels if session.dark is not None else np.zeros(model.shape[1])
+    # The basis was learnt on raw Average sheets, so reconstruct before dark subtraction
+    values = model.reconstruct(readings + dark[pds]) - dark[None, :]
+    failed = quality == QUALITY_FAILED
+    values[leds[failed], pds[failed]] = np.nan
+
+    timestamps = np.full(model.shape, time.time())
+    frame_quality = np.zeros(model.shape, dtype=np.uint8)
+    frame_quality[leds, pds] = quality
+    return FullFrame(values.astype(np.float32), timestamps, wall_start, time.perf_counter() - perf_start,
+                     frame_quality)
+
+
+# === Main: reconstruction error vs K, then fit and save the scan model ===
+if __name__ == "__main__":
+    matrices = load_training_matrices()
+    print(f"📚 {len(matrices)} recorded matrices, rank-{RANK} basis")
+    for num_pairs, rmse in reconstruction_error(matrices).items():
+        print(f"   K={num_pairs:4d} pairs ({num_pairs / matrices[0].size:5.1%} of the scan): RMSE {rmse:6.2f} counts")
+    model = CompressiveModel.fit(matrices)
+    model.save()
+    print(f"💾 Saved {len(model.pairs)}-pair model to {MODEL_PATH}")
@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+
+from cnn_model.command_pipeline import parse_value
+
+# Configuration
+DARK_REFRESH_INTERVAL = 10.0  # Seconds between incremental dark-frame refreshes
+DARK_REFRESH_CELLS = 5        # Photodiodes re-read per refresh (oldest first)
+DARK_SMOOTHING = 0.5          # Weight of a new dark reading against the cached one
+DARK_CAPTURE_READS = 3        # Reads averaged per photodiode for the initial dark frame
+
+
+class DarkFrameCache:
+    """
+    Per-photodiode ambient level measured with every LED off.
+
+    capture() reads the whole dark frame once; maybe_refresh() re-reads only the few
+    stalest photodiodes once refresh_interval has passed, so slow ambient drift is
+    tracked without ever pausing for a full dark scan. subtract() / subtract_full()
+    remove the cached level from a (rows, cols) frame or a full (LEDs, PDs) matrix in
+    one broadcast step.
+    """
+
+    def __init__(self, session, refresh_interval=DARK_REFRESH_INTERVAL, refresh_cells=DARK_REFRESH_CELLS,
+                 smoothing=DARK_SMOOTHING):
+        self.session = session
+        self.refresh_interval = refresh_interval
+        self.refresh_cells = refresh_cells
+        self.smoothing = smoothing
+        num_cells = session.num_rows * session.num_cols
+        self.levels = np.zeros(num_cells, dtype=np.float32)
+        self.updated_at = np.zeros(num_cells, dtype=np.float64)   # time.time() per photodiode
+        self.last_refresh = 0.0
+
+    def _read_dark(self, cells):
+        """Read the given PD cells with all LEDs off; NaN where a read failed."""
+        session = self.session
+        session.pipeline.drain()
+        session.command('LAF')
+        pending = [session.queue_read(cell // session.num_cols + 1, cell % session.num_cols + 1) for cell in cells]
+        return np.array([parse_value(session.pipeline.wait(reply)) for reply in pending])
+
+    def capture(self, reads=DARK_CAPTURE_READS):
+        cells = np.arange(len(self.levels))
+        readings = np.nanmean([self._read_dark(cells) for _ in range(reads)], axis=0)
+        valid = ~np.isnan(readings)
+        self.levels[valid] = readings[valid]
+        self.updated_at[valid] = time.time()
+        self.last_refresh = time.time()
+        return self.levels.reshape(self.session.num_rows, self.session.num_cols)
+
+    def maybe_refresh(self):
+        """Re-read the refresh_cells stalest photodiodes if refresh_interval has passed."""
+        if time.time() - self.last_refresh < self.refresh_interval:
+            return False
+        cells = np.argsort(self.updated_at)[:self.refresh_cells]
+        readings = self._read_dark(cells)
+        valid = ~np.isnan(readings)
+        cells, readings = cells[valid], readings[valid]
+        self.levels[cells] += self.smoothing * (readings - self.levels[cells])
+        self.updated_at[cells] = time.time()
+        self.last_refresh = time.time()
+        return True
+
+    def subtract(self, frame):
+        """Diagonal / photodiode frame (rows, cols) minus the dark level of each photodiode."""
+        return np.asarray(frame) - self.levels.reshape(np.shape(frame))
+
+    def subtract_full(self, matrix):
+        """Full (LEDs, PDs) matrix minus the dark level of each PD column."""
+        return np.asarray(matrix) - self.levels[None, :]
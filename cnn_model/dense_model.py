@@ -1,6 +1,5 @@
 import pickle
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import Dense, Dropout
@@ -11,54 +10,83 @@ from sklearn.preprocessing import MinMaxScaler
 import os
 import tkinter as tk
 
-from cnn_model.method_two_data import collect_sensor_matrix
+from cnn_model.feedback_log import FEEDBACK_PATH, FeedbackLog
+from cnn_model.method_two_data import collect_sensor_matrix, COM_PORT, STORE_PATH
+from cnn_model.frame_recorder import FrameRecorder
+from cnn_model.live_acquisition import run_live_loop
+from cnn_model.sample_store import SampleStore, import_csv
+from cnn_model.sensor_session import SensorSession
 
 # Constants
 NUM_ROWS, NUM_COLS = 5, 5
-SENSOR_COLUMNS = [f'Y{i}' for i in range(25)]
-LED_COLUMNS = [f'X{i}' for i in range(25)]
+NUM_CELLS = NUM_ROWS * NUM_COLS
+DATASET_PATH = STORE_PATH  # Sample store the collection scripts append to
+LEGACY_CSV = 'dataset.csv'  # Imported into an empty store once
 MODEL_FILE = 'regression_model.keras'
 SCALER_FILE = 'x_scaler.pkl'
+LIVE_MODE = False  # Continuous acquisition + prediction instead of one-shot with feedback
+LIVE_LOG_PATH = None  # e.g. 'frames_log' to record every live frame for offline replay
 buttons = [[None for _ in range(NUM_COLS)] for _ in range(NUM_ROWS)]
 
 # === Data Load & Save ===
-def load_data(path='dataset.csv'):
-    df = pd.read_csv(path)
-    X = df[SENSOR_COLUMNS].values.astype(np.float32)
-    Y = df[LED_COLUMNS].values.astype(np.float32)
+def _valid_rows(X, Y):
+    valid = ~np.isnan(X).any(axis=1)  # frames with failed cells
+    if not valid.all():
+        print(f"⚠️ Dropping {int((~valid).sum())} sample(s) with failed cells.")
+    return X[valid], Y[valid]
+
+def _read_base(path):
+    store = SampleStore(path)
+    if not len(store) and os.path.exists(LEGACY_CSV):
+        print(f"📦 Importing {import_csv(LEGACY_CSV, path)} samples from {LEGACY_CSV} into {path}")
+    sensors, masks, _ = store.load()
+    return _valid_rows(sensors.reshape(len(sensors), -1), masks.reshape(len(masks), -1).astype(np.float32))
+
+def load_data(path=DATASET_PATH, feedback_path=FEEDBACK_PATH):
+    """
+    Base samples split 80/20 plus every feedback segment added to the training side with
+    its weight; returns X_train, X_test, Y_train, Y_test, W_train (per-sample weights).
+    """
+    X, Y = _read_base(path)
+    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
+    W_train = np.ones(len(X_train), dtype=np.float32)
+    if feedback_path and os.path.isdir(feedback_path):
+        sensors, masks, weights = FeedbackLog(feedback_path).load()
+        keep = ~np.isnan(sensors.reshape(len(sensors), -1)).any(axis=1)
+        sensors, masks, weights = sensors[keep], masks[keep], weights[keep]
+        X_train = np.concatenate([X_train, sensors.reshape(len(sensors), -1)])
+        Y_train = np.concatenate([Y_train, masks.reshape(len(masks), -1).astype(np.float32)])
+        W_train = np.concatenate([W_train, weights])
+    # fit(validation_split=...) holds out the last rows, so mix the feedback into the base rows
+    order = np.random.default_rng(42).permutation(len(X_train))
+    X_train, Y_train, W_train = X_train[order], Y_train[order], W_train[order]
     x_scaler = MinMaxScaler()
-    X_scaled = x_scaler.fit_transform(X)
+    X_train = x_scaler.fit_transform(X_train)
+    X_test = x_scaler.transform(X_test)
     with open(SCALER_FILE, 'wb') as f:
         pickle.dump(x_scaler, f)
-    return train_test_split(X_scaled, Y, test_size=0.2, random_state=42)
-
-def save_feedback(sensor_matrix, correct_led_mask):
-    flat_sensor = sensor_matrix.flatten().tolist()
-    flat_led = correct_led_mask.flatten().tolist()
-    row = flat_sensor + flat_led
-    columns = SENSOR_COLUMNS + LED_COLUMNS
-    df = pd.DataFrame([row], columns=columns)
-    if not os.path.exists('dataset.csv'):
-        df.to_csv('dataset.csv', index=False)
-    else:
-        df.to_csv('dataset.csv', mode='a', header=False, index=False)
+    return X_train, X_test, Y_train, Y_test, W_train
+
+def save_feedback(sensor_matrix, correct_led_mask, feedback_path=FEEDBACK_PATH):
+    segment, count = FeedbackLog(feedback_path).append(sensor_matrix, correct_led_mask)
+    print(f"🧩 Feedback sample {count} saved to {feedback_path}/{segment}.")
 
 # === Model ===
 def build_regression_model():
     model = Sequential([
-        Dense(256, activation='relu', input_shape=(25,)),
+        Dense(256, activation='relu', input_shape=(NUM_CELLS,)),
         Dropout(0.3),
         Dense(128, activation='relu'),
         Dropout(0.2),
-        Dense(25)
+        Dense(NUM_CELLS)
     ])
     model.compile(optimizer='adam', loss=MeanSquaredError(), metrics=[MeanAbsoluteError()])
     return model
 
 def train_and_evaluate():
-    X_train, X_test, Y_train, Y_test = load_data()
+    X_train, X_test, Y_train, Y_test, W_train = load_data()
     model = build_regression_model()
-    history = model.fit(X_train, Y_train, epochs=100, batch_size=16, validation_split=0.1)
+    history = model.fit(X_train, Y_train, sample_weight=W_train, epochs=100, batch_size=16, validation_split=0.1)
     loss, mae = model.evaluate(X_test, Y_test)
     print(f"✅ Test MAE: {mae:.2f}")
     print(f"📊 Final Training Loss: {history.history['loss'][-1]:.4f}")
@@ -66,35 +94,36 @@ def train_and_evaluate():
     model.save(MODEL_FILE)
     return model, history
 
-def retrain_with_feedback():
-    original = pd.read_csv('dataset.csv')
-    if os.path.exists('dataset.csv'):
-        feedback = pd.read_csv('dataset.csv')
-        feedback_augmented = pd.concat([feedback] * 3, ignore_index=True)
-        combined = pd.concat([original, feedback_augmented], ignore_index=True)
-        combined.to_csv('dataset_fixed.csv', index=False)
-        os.remove('dataset.csv')
-        print("📈 Retraining with feedback...")
-        train_and_evaluate()
-    else:
-        print("ℹ️ No new feedback to retrain on.")
+def retrain_with_feedback(feedback_path=FEEDBACK_PATH):
+    segment = FeedbackLog(feedback_path).seal() if os.path.isdir(feedback_path) else None
+    if segment is not None:
+        print(f"📈 Retraining with feedback up to {segment}...")
+        return train_and_evaluate()
+    print("ℹ️ No new feedback to retrain on.")
 
 # === Prediction ===
-def predict_new_sample(sensor_values):
+def load_predictor():
     if not os.path.exists(MODEL_FILE):
         raise FileNotFoundError("Model not found. Train the model first.")
     model = load_model(MODEL_FILE)
     with open(SCALER_FILE, 'rb') as f:
         x_scaler = pickle.load(f)
-    sensor_values = np.array(sensor_values).reshape(1, 25).astype(np.float32)
+    return model, x_scaler
+
+def predict_new_sample(sensor_values, predictor=None):
+    model, x_scaler = load_predictor() if predictor is None else predictor
+    sensor_values = np.array(sensor_values).reshape(1, NUM_CELLS).astype(np.float32)
+    if np.isnan(sensor_values).any():
+        print(f"⚠️ No prediction: {int(np.isnan(sensor_values).sum())} failed cell(s) in the frame.")
+        return None
     sensor_scaled = x_scaler.transform(sensor_values)
-    prediction = model.predict(sensor_scaled)[0]
+    prediction = model.predict(sensor_scaled, verbose=0)[0]
     predicted_mask = (prediction > 0.5).astype(int)
 
     predicted_mask_grid = predicted_mask.reshape(NUM_ROWS, NUM_COLS)
     flipped = np.flipud(predicted_mask_grid)
 
-    print("🔍 Predicted LED mask (5x5):")
+    print(f"🔍 Predicted LED mask ({NUM_ROWS}x{NUM_COLS}):")
     for row in flipped:
         print(" ".join(map(str, row)))
     return predicted_mask
@@ -155,8 +184,40 @@ def plot_overlay(led_mask, sensor_matrix):
     plt.grid(False)
     plt.show()
 
+# === Live Mode ===
+def run_live_mode(port=COM_PORT):
+    """Scan continuously in the background; predict and redraw on the newest frame only."""
+    predictor = load_predictor()
+    plt.ion()
+    fig, ax = plt.subplots()
+    image = ax.imshow(np.zeros((NUM_ROWS, NUM_COLS)), cmap='viridis', vmin=0, vmax=1023)
+    plt.colorbar(image, ax=ax)
+
+    def on_frame(sensor_matrix, timestamp):
+        if not plt.fignum_exists(fig.number):
+            return False
+        if np.isnan(sensor_matrix).any():  # failed cells: skip the frame, keep the last prediction on screen
+            return
+        predicted_mask = predict_new_sample(sensor_matrix.flatten(), predictor).reshape(NUM_ROWS, NUM_COLS)
+        image.set_data(np.flipud(sensor_matrix))
+        ax.set_title(f"Live PD readings – {int(predicted_mask.sum())} LED cell(s) predicted")
+        plt.pause(0.001)
+
+    # Live frames carry no object labels; led_mask records that the diagonal scan lit every LED in turn
+    recorder = FrameRecorder(LIVE_LOG_PATH, (NUM_ROWS, NUM_COLS), (NUM_ROWS, NUM_COLS)) if LIVE_LOG_PATH else None
+    try:
+        with SensorSession(port, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+            run_live_loop(session.scan_diagonal, (NUM_ROWS, NUM_COLS), on_frame, recorder=recorder,
+                          quality=lambda: session.last_quality, led_mask=np.ones((NUM_ROWS, NUM_COLS), np.uint8))
+    finally:
+        if recorder is not None:
+            recorder.close()  # flush the frames buffered since the last index update
+
 # === Main Execution ===
-if __name__ == '__main__':
+if __name__ == '__main__' and LIVE_MODE:
+    run_live_mode()
+
+elif __name__ == '__main__':
     model, history = train_and_evaluate()
 
     # Plot training vs validation loss
@@ -174,6 +235,8 @@ if __name__ == '__main__':
 
     # Predict LED mask
     predicted_led_mask = predict_new_sample(sensor_matrix.flatten())
+    if predicted_led_mask is None:
+        raise SystemExit("❌ Scan still has failed cells after rescanning; check the board and wiring.")
     predicted_mask_2d = predicted_led_mask.reshape(NUM_ROWS, NUM_COLS)
 
     # Visualize prediction
@@ -10,19 +10,25 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 import os
 
-from cnn_model.method_two_data import collect_sensor_matrix
+from cnn_model.grid import block_positions, class_id_to_mask, value_columns
+from cnn_model.method_two_data import collect_sensor_matrix, COM_PORT
+from cnn_model.live_acquisition import run_live_loop
+from cnn_model.sensor_session import SensorSession
 
 # Constants
 NUM_ROWS, NUM_COLS = 5, 5
-SENSOR_COLUMNS = [f'Y{i}' for i in range(25)]
+NUM_CELLS = NUM_ROWS * NUM_COLS
+NUM_CLASSES = block_positions(NUM_ROWS, NUM_COLS)  # one class per 2x2 object position
+SENSOR_COLUMNS = value_columns('Y', NUM_ROWS, NUM_COLS)
 MODEL_FILE = 'classification_model.keras'
 SCALER_FILE = 'x_scaler.pkl'
+LIVE_MODE = False  # Continuous acquisition + classification instead of a single frame
 
 # Load and prepare data
 def load_data(path='Transformed_Dataset.csv'):
     df = pd.read_csv(path)
     X = df[SENSOR_COLUMNS].values.astype(np.float32)
-    Y = df['class_id'].values.astype(np.int32) - 1  # classes 0-15
+    Y = df['class_id'].values.astype(np.int32) - 1  # classes 0 .. NUM_CLASSES-1
     x_scaler = MinMaxScaler()
     X_scaled = x_scaler.fit_transform(X)
     with open(SCALER_FILE, 'wb') as f:
@@ -32,11 +38,11 @@ def load_data(path='Transformed_Dataset.csv'):
 # Build classification model
 def build_classification_model():
     model = Sequential([
-        Dense(256, activation='relu', input_shape=(25,)),
+        Dense(256, activation='relu', input_shape=(NUM_CELLS,)),
         Dropout(0.3),
         Dense(128, activation='relu'),
         Dropout(0.2),
-        Dense(16, activation='softmax')
+        Dense(NUM_CLASSES, activation='softmax')
     ])
     model.compile(optimizer='adam',
                   loss=SparseCategoricalCrossentropy(),
@@ -53,33 +59,52 @@ def train_and_evaluate():
     model.save(MODEL_FILE)
     return model
 
-# Convert class ID to 5x5 mask
-def class_id_to_mask(class_id):
-    mask = np.zeros((5, 5), dtype=int)
-    if 1 <= class_id <= 16:
-        i, j = divmod(class_id - 1, 4)
-        mask[i:i+2, j:j+2] = 1
-    return mask
-
-# Predict from a sensor sample
-def predict_class(sensor_values):
+# Load the trained model and scaler once
+def load_predictor():
     if not os.path.exists(MODEL_FILE):
         raise FileNotFoundError("Model not found. Train the model first.")
     model = load_model(MODEL_FILE)
     with open(SCALER_FILE, 'rb') as f:
         x_scaler = pickle.load(f)
-    sensor_values = np.array(sensor_values).reshape(1, 25).astype(np.float32)
+    return model, x_scaler
+
+# Predict from a sensor sample (None if the frame has failed cells)
+def predict_class(sensor_values, predictor=None):
+    model, x_scaler = load_predictor() if predictor is None else predictor
+    sensor_values = np.array(sensor_values).reshape(1, NUM_CELLS).astype(np.float32)
+    if np.isnan(sensor_values).any():
+        print(f"⚠️ No prediction: {int(np.isnan(sensor_values).sum())} failed cell(s) in the frame.")
+        return None
     sensor_scaled = x_scaler.transform(sensor_values)
-    prediction = model.predict(sensor_scaled)
+    prediction = model.predict(sensor_scaled, verbose=0)
     class_id = np.argmax(prediction) + 1
-    return class_id, class_id_to_mask(class_id)
+    return class_id, class_id_to_mask(class_id, NUM_ROWS, NUM_COLS)
+
+# Continuous mode: acquisition never waits for TensorFlow
+def run_live_mode(port=COM_PORT):
+    predictor = load_predictor()
+
+    def on_frame(sensor_matrix, timestamp):
+        if np.isnan(sensor_matrix).any():  # failed cells: skip the frame
+            return
+        class_id, _ = predict_class(sensor_matrix.flatten(), predictor)
+        print(f"🔍 [{timestamp:.2f}] Predicted class ID: {class_id}")
+
+    with SensorSession(port, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+        run_live_loop(session.scan_diagonal, (NUM_ROWS, NUM_COLS), on_frame)
 
 # Example usage
-if __name__ == '__main__':
+if __name__ == '__main__' and LIVE_MODE:
+    run_live_mode()
+
+elif __name__ == '__main__':
     #model = train_and_evaluate()
 
     sensor_matrix = collect_sensor_matrix()
-    class_id, predicted_led_mask = predict_class(sensor_matrix.flatten())
+    result = predict_class(sensor_matrix.flatten())
+    if result is None:
+        raise SystemExit("❌ Scan still has failed cells after rescanning; check the board and wiring.")
+    class_id, predicted_led_mask = result
 
     print(f"🔍 Predicted class ID: {class_id}")
     print(predicted_led_mask)
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+
+from cnn_model.grid import NUM_COLS, NUM_ROWS
+from cnn_model.sample_store import SampleStore, StoreLock, save_json
+
+# Configuration
+FEEDBACK_PATH = 'feedback_deltas'   # Directory holding manifest.json and one sample store per segment
+FEEDBACK_WEIGHT = 3.0               # Training weight of a corrected sample (was: feedback rows repeated 3x)
+LOG_VERSION = 1
+
+#
+# Each feedback segment is a small SampleStore; manifest.json lists the segments with
+# their sample weight and whether they are sealed.
+#
+
+
+class FeedbackLog:
+    """Weighted, versioned feedback samples kept apart from the base dataset."""
+
+    def __init__(self, path=FEEDBACK_PATH, sensor_shape=(NUM_ROWS, NUM_COLS), mask_shape=(NUM_ROWS, NUM_COLS)):
+        self.path = path
+        self.sensor_shape = tuple(sensor_shape)
+        self.mask_shape = tuple(mask_shape)
+        os.makedirs(path, exist_ok=True)
+        with StoreLock(self._lock_path):
+            if not os.path.exists(self._manifest_path):
+                self._write_manifest({'version': LOG_VERSION, 'segments': []})
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.path, 'manifest.json')
+
+    @property
+    def _lock_path(self):
+        return os.path.join(self.path, 'manifest.lock')
+
+    def _read_manifest(self):
+        with open(self._manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        save_json(self._manifest_path, manifest)
+
+    def segments(self):
+        """Manifest entries, oldest first: {'name', 'weight', 'sealed'}."""
+        return self._read_manifest()['segments']
+
+    def _store(self, name):
+        return SampleStore(os.path.join(self.path, name), self.sensor_shape, self.mask_shape)
+
+    def append(self, sensors, mask, weight=FEEDBACK_WEIGHT):
+        """Add one corrected sample to the open segment (a new one if the last was sealed or weighs differently)."""
+        with StoreLock(self._lock_path):
+            manifest = self._read_manifest()
+            segments = manifest['segments']
+            if not segments or segments[-1]['sealed'] or segments[-1]['weight'] != weight:
+                if segments:
+                    segments[-1]['sealed'] = True
+                segments.append({'name': f'delta_{len(segments) + 1:05d}', 'weight': weight, 'sealed': False})
+                self._write_manifest(manifest)
+            name = segments[-1]['name']
+        return name, self._store(name).append(sensors, mask)
+
+    def seal(self):
+        """Close the open segment; returns its name, or None if there was nothing to seal."""
+        with StoreLock(self._lock_path):
+            manifest = self._read_manifest()
+            segments = manifest['segments']
+            if not segments or segments[-1]['sealed']:
+                return None
+            segments[-1]['sealed'] = True
+            self._write_manifest(manifest)
+            return segments[-1]['name']
+
+    def __len__(self):
+        return sum(len(self._store(segment['name'])) for segment in self.segments())
+
+    def load(self):
+        """(sensors (N, rows, cols) float32, masks (N, rows, cols) uint8, weights (N,) float32) over all segments."""
+        sensors, masks, weights = [], [], []
+        for segment in self.segments():
+            s, m, _ = self._store(segment['name']).load()
+            sensors.append(s)
+            masks.append(m)
+            weights.append(np.full(len(s), segment['weight'], dtype=np.float32))
+        if not sensors:
+            return (np.zeros((0,) + self.sensor_shape, np.float32), np.zeros((0,) + self.mask_shape, np.uint8),
+                    np.zeros(0, np.float32))
+        return np.concatenate(sensors), np.concatenate(masks), np.concatenate(weights)
+
+
+# === Main: summarise the feedback segments ===
+if __name__ == "__main__":
+    log = FeedbackLog()
+    for segment in log.segments():
+        count = len(log._store(segment['name']))
+        state = 'sealed' if segment['sealed'] else 'open'
+        print(f"🧩 {segment['name']}: {count} samples, weight {segment['weight']}, {state}")
+    print(f"📦 {len(log)} feedback samples in {FEEDBACK_PATH}")
@@ -0,0 +1,149 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from cnn_model.sample_store import save_json
+
+# Configuration
+LOG_PATH = 'frames_log'   # Writes frames_log.frames (records) and frames_log.json (index)
+INITIAL_CAPACITY = 1024   # Records preallocated; the file doubles whenever it fills up
+FLUSH_EVERY = 32          # Appends between index/flush updates
+LOG_VERSION = 1
+
+
+def record_dtype(frame_shape, mask_shape):
+    """One log entry: when, the frame, its per-cell quality flags and the LED mask that was lit."""
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('frame', '<f4', tuple(frame_shape)),
+        ('quality', 'u1', tuple(frame_shape)),
+        ('led_mask', 'u1', tuple(mask_shape)),
+    ])
+
+
+def _index_path(path):
+    return f'{path}.json'
+
+
+def _data_path(path):
+    return f'{path}.frames'
+
+
+def _read_index(path):
+    with open(_index_path(path)) as f:
+        return json.load(f)
+
+
+class FrameRecorder:
+    """
+    Append-only raw frame log on a preallocated np.memmap. Appending is a single record
+    copy into the mapped file; when the file is full it is grown (doubled) and remapped.
+    The JSON index records shapes and the number of valid records, so a crashed run
+    loses at most FLUSH_EVERY frames. Opening an existing log appends to it.
+    """
+
+    def __init__(self, path=LOG_PATH, frame_shape=(5, 5), mask_shape=(5, 5), capacity=INITIAL_CAPACITY):
+        self.path = path
+        if os.path.exists(_index_path(path)):
+            index = _read_index(path)
+            frame_shape, mask_shape = index['frame_shape'], index['mask_shape']
+            self.count = index['count']
+            capacity = max(index['capacity'], self.count)
+        else:
+            self.count = 0
+        self.frame_shape = tuple(frame_shape)
+        self.mask_shape = tuple(mask_shape)
+        self.dtype = record_dtype(self.frame_shape, self.mask_shape)
+        self._map(capacity)
+
+    def _map(self, capacity):
+        size = capacity * self.dtype.itemsize
+        with open(_data_path(self.path), 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.capacity = capacity
+        self.records = np.memmap(_data_path(self.path), dtype=self.dtype, mode='r+', shape=(capacity,))
+
+    def _grow(self):
+        self.records.flush()
+        del self.records
+        self._map(self.capacity * 2)
+
+    def append(self, frame, timestamp=None, led_mask=None, quality=None):
+        if self.count == self.capacity:
+            self._grow()
+        record = self.records[self.count]
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        record['frame'] = frame
+        record['quality'] = 0 if quality is None else quality
+        record['led_mask'] = 0 if led_mask is None else led_mask
+        self.count += 1
+        if self.count % FLUSH_EVERY == 0:
+            self.flush()
+
+    def flush(self):
+        self.records.flush()
+        index = {'version': LOG_VERSION, 'frame_shape': list(self.frame_shape),
+                 'mask_shape': list(self.mask_shape), 'capacity': self.capacity, 'count': self.count}
+        save_json(_index_path(self.path), index)
+
+    def close(self):
+        self.flush()
+        del self.records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameLog:
+    """Read-only view of a recorded log; records are memory-mapped, nothing is loaded up front."""
+
+    def __init__(self, path=LOG_PATH):
+        index = _read_index(path)
+        self.frame_shape = tuple(index['frame_shape'])
+        self.mask_shape = tuple(index['mask_shape'])
+        self.dtype = record_dtype(self.frame_shape, self.mask_shape)
+        self.count = index['count']
+        self.records = np.memmap(_data_path(path), dtype=self.dtype, mode='r', shape=(self.count,))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def frames(self):
+        return self.records['frame']
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    def replay(self, realtime=False, speed=1.0, start=0, stop=None):
+        """
+        Yield (timestamp, frame, led_mask, quality) in recording order. realtime=True keeps
+        the original spacing between frames (divided by speed); otherwise as fast as possible.
+        """
+        first = None
+        t0 = time.perf_counter()
+        for record in self.records[start:stop]:
+            if realtime:
+                first = record['timestamp'] if first is None else first
+                time.sleep(max((record['timestamp'] - first) / speed - (time.perf_counter() - t0), 0.0))
+            yield record['timestamp'], record['frame'], record['led_mask'], record['quality']
+
+
+# === Main: replay benchmark ===
+if __name__ == "__main__":
+    log = FrameLog(LOG_PATH)
+    start = time.perf_counter()
+    checksum = 0.0
+    for _, frame, _, _ in log.replay():
+        checksum += float(frame.sum())
+    elapsed = time.perf_counter() - start
+    span = log.timestamps[-1] - log.timestamps[0] if len(log) else 0.0
+    print(f"▶️ Replayed {len(log)} frames ({span / 60:.1f} min of recording) in {elapsed:.3f} s "
+          f"-> {len(log) / max(elapsed, 1e-9):.0f} frames/s")
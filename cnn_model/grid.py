@@ -0,0 +1,56 @@
+import numpy as np
+
+# Configuration
+NUM_ROWS = 5
+NUM_COLS = 5
+MAX_SINGLE_DIGIT = 9  # LOXrc / DONrc only address up to 9x9; larger grids use LOXrrcc / DONrrcc
+
+#
+# Cells are numbered row-major from 0: cell = (row - 1) * num_cols + (col - 1) for the
+# 1-based (row, col) used on the wire. Full response matrices are (LED cell, PD cell).
+#
+
+
+def num_cells(num_rows=NUM_ROWS, num_cols=NUM_COLS):
+    return num_rows * num_cols
+
+
+def address_width(num_rows=NUM_ROWS, num_cols=NUM_COLS):
+    """Digits per coordinate in LOX/DON/LON/LOF commands for this grid."""
+    return 1 if max(num_rows, num_cols) <= MAX_SINGLE_DIGIT else 2
+
+
+def cell_address(row, col, num_rows=NUM_ROWS, num_cols=NUM_COLS):
+    """Command suffix for 1-based (row, col): '23' on grids up to 9x9, '0203' beyond."""
+    width = address_width(num_rows, num_cols)
+    return f'{row:0{width}d}{col:0{width}d}'
+
+
+def split_address(digits):
+    """Inverse of cell_address: '23' -> (2, 3), '1016' -> (10, 16)."""
+    half = len(digits) // 2
+    return int(digits[:half]), int(digits[half:])
+
+
+def cell_position(cell, num_cols=NUM_COLS):
+    """0-based cell index -> 1-based (row, col)."""
+    return cell // num_cols + 1, cell % num_cols + 1
+
+
+def value_columns(prefix, num_rows=NUM_ROWS, num_cols=NUM_COLS):
+    """CSV column names for one flattened grid, e.g. Y0..Y24 on a 5x5 board."""
+    return [f'{prefix}{i}' for i in range(num_rows * num_cols)]
+
+
+def block_positions(num_rows=NUM_ROWS, num_cols=NUM_COLS, block=2):
+    """Number of (row, col) offsets a block x block object can take on the grid."""
+    return (num_rows - block + 1) * (num_cols - block + 1)
+
+
+def class_id_to_mask(class_id, num_rows=NUM_ROWS, num_cols=NUM_COLS, block=2):
+    """1-based class ID (row-major block position) -> binary grid mask; all zeros if out of range."""
+    mask = np.zeros((num_rows, num_cols), dtype=int)
+    if 1 <= class_id <= block_positions(num_rows, num_cols, block):
+        i, j = divmod(class_id - 1, num_cols - block + 1)
+        mask[i:i + block, j:j + block] = 1
+    return mask
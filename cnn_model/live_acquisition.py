@@ -0,0 +1,118 @@
+import threading
+import time
+
+import numpy as np
+
+# Configuration
+RING_CAPACITY = 64   # Frames kept in memory for consumers
+WAIT_TIMEOUT = 5.0   # Seconds a consumer waits for a new frame before re-checking
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size, preallocated ring of timestamped frames shared between one producer
+    (the acquisition thread) and any number of consumers. Old frames are overwritten.
+    """
+
+    def __init__(self, frame_shape, capacity=RING_CAPACITY, dtype=np.float32):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity,) + tuple(frame_shape), dtype=dtype)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.count = 0  # frames pushed so far; the newest frame has sequence number count
+        self._new_frame = threading.Condition()
+
+    def push(self, frame, timestamp=None):
+        with self._new_frame:
+            slot = self.count % self.capacity
+            self.frames[slot] = frame
+            self.timestamps[slot] = time.time() if timestamp is None else timestamp
+            self.count += 1
+            self._new_frame.notify_all()
+
+    def latest(self):
+        """(sequence, timestamp, frame copy) of the newest frame, or None if empty."""
+        with self._new_frame:
+            if self.count == 0:
+                return None
+            slot = (self.count - 1) % self.capacity
+            return self.count, self.timestamps[slot], self.frames[slot].copy()
+
+    def wait_for_new(self, last_seq=0, timeout=WAIT_TIMEOUT):
+        """Block until a frame newer than last_seq exists; return latest() or None on timeout."""
+        with self._new_frame:
+            if not self._new_frame.wait_for(lambda: self.count > last_seq, timeout):
+                return None
+        return self.latest()
+
+    def recent(self, n):
+        """The last n frames (oldest first) and their timestamps."""
+        with self._new_frame:
+            n = min(n, self.count, self.capacity)
+            slots = [(self.count - n + i) % self.capacity for i in range(n)]
+            return self.frames[slots].copy(), self.timestamps[slots].copy()
+
+
+class AcquisitionThread(threading.Thread):
+    """
+    Runs scan() back-to-back on its own thread and pushes every frame into a ring buffer.
+    With a FrameRecorder every frame (and quality(), if given, and the led_mask lit by
+    the scan) is also appended to disk.
+    """
+
+    def __init__(self, scan, frame_shape, capacity=RING_CAPACITY, recorder=None, quality=None, led_mask=None):
+        super().__init__(daemon=True)
+        self.scan = scan
+        self.buffer = FrameRingBuffer(frame_shape, capacity)
+        self.recorder = recorder
+        self.quality = quality
+        self.led_mask = led_mask
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                frame = self.scan()
+                timestamp = time.time()
+                self.buffer.push(frame, timestamp)
+                if self.recorder is not None:
+                    self.recorder.append(frame, timestamp, led_mask=self.led_mask,
+                                         quality=None if self.quality is None else self.quality())
+        except Exception as e:  # surfaced to the consumer via self.error
+            self.error = e
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_live_loop(scan, frame_shape, on_frame, max_frames=None, recorder=None, quality=None, led_mask=None):
+    """
+    Continuous mode: acquisition runs in the background while on_frame(frame, timestamp)
+    handles only the newest frame each time, so slow inference or plotting never stalls
+    the scan. Stops on KeyboardInterrupt, after max_frames handled frames, or when
+    on_frame returns False. Pass a FrameRecorder to keep every acquired frame on disk.
+    """
+    acquisition = AcquisitionThread(scan, frame_shape, recorder=recorder, quality=quality, led_mask=led_mask)
+    acquisition.start()
+    last_seq = 0
+    handled = 0
+    try:
+        while max_frames is None or handled < max_frames:
+            item = acquisition.buffer.wait_for_new(last_seq)
+            if acquisition.error is not None:
+                raise acquisition.error
+            if item is None:
+                continue
+            seq, timestamp, frame = item
+            if seq - last_seq > 1:
+                print(f"⏩ Skipped {seq - last_seq - 1} frame(s) while busy")
+            last_seq = seq
+            handled += 1
+            if on_frame(frame, timestamp) is False:
+                break
+    except KeyboardInterrupt:
+        print("🛑 Live mode stopped.")
+    finally:
+        acquisition.stop()
+    return acquisition.buffer
@@ -1,18 +1,19 @@
-import serial
 import time
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-import os
-import json
+
+from cnn_model.sample_store import save_sample
+from cnn_model.scan_engine import QUALITY_FAILED
+from cnn_model.sensor_session import SensorSession, borrow_session
 
 # Configuration
 COM_PORT = 'COM3'
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-CSV_PATH = 'dataset.csv'
+STORE_PATH = 'dataset_store'  # Sample store directory (see sample_store.py)
 NUM_ITERATIONS = 1
+MAX_RESCANS = 2  # Extra scans when a cell is still invalid after the per-cell retries
 
 LED_TEXT = """
 0 0 0 0 0
@@ -31,59 +32,22 @@ def parse_led_text(text):
 
 LED_MASK = parse_led_text(LED_TEXT)
 
-def collect_sensor_matrix():
-    """Use new Arduino interface: send LOXxy + DONxy + GETVAL for each LED/PD pair."""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    matrix = np.zeros((NUM_ROWS, NUM_COLS))
-
-    for row in range(NUM_ROWS):
-        for col in range(NUM_COLS):
-            led_cmd = f'LOX{row+1}{col+1}\n'.encode()
-            pd_cmd = f'DON{row+1}{col+1}\n'.encode()
-
-            ser.write(led_cmd)
-            time.sleep(0.05)
-
-            ser.write(pd_cmd)
-            time.sleep(0.05)
-
-            ser.write(b'GETVAL\n')
-            line = ser.readline().decode().strip()
-            print(line)
-
-            try:
-                data = json.loads(line)
-                val = float(data['val'])
-            except:
-                val = 0.0  # fallback in case of error
-
-            matrix[row, col] = val
-            time.sleep(0.05)
-
-            ser.write(b'LAF\n')
-            time.sleep(0.05)
-
-    ser.close()
+def collect_sensor_matrix(port=COM_PORT, session=None, max_rescans=MAX_RESCANS):
+    """
+    Use new Arduino interface: send LOXxy + DONxy + GETVAL for each LED/PD pair.
+    Rescans while a cell is QUALITY_FAILED; failed cells that remain are NaN.
+    """
+    with borrow_session(session, port, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        matrix = sensor.scan_diagonal()
+        for attempt in range(max_rescans):
+            failed = (sensor.last_quality == QUALITY_FAILED).sum()
+            if not failed:
+                break
+            print(f"🔁 {failed} failed cell(s), rescanning ({attempt + 1}/{max_rescans})")
+            matrix = sensor.scan_diagonal()
+    print(matrix)
     return matrix
 
-def save_sample_to_csv(X, Y, path=CSV_PATH):
-    x_flat = X.flatten()
-    y_flat = Y.flatten()
-    sample = np.concatenate((y_flat, x_flat))
-    column_names = [f'Y{i}' for i in range(25)] + [f'X{i}' for i in range(25)]
-
-    if not os.path.exists(path):
-        df = pd.DataFrame([sample], columns=column_names)
-        df.to_csv(path, index=False)
-        print("✅ Created new dataset.csv and saved sample.")
-    else:
-        df = pd.read_csv(path)
-        df.loc[len(df)] = sample
-        df.to_csv(path, index=False)
-        print("✅ Appended new sample to dataset.csv.")
-
 def plot_overlay(led_mask, sensor_matrix):
     flipped_matrix = np.flipud(sensor_matrix)
     flipped_mask = np.flipud(led_mask)
@@ -111,32 +75,30 @@ def plot_overlay(led_mask, sensor_matrix):
     plt.grid(False)
     plt.show()
 
-def run_collection_loop(led_mask, num_runs=1):
-    for i in range(num_runs):
-        print(f"\n🔁 Sample {i + 1}/{num_runs}")
-        sensor_matrix = collect_sensor_matrix()
-        save_sample_to_csv(led_mask, sensor_matrix)
-        plot_overlay(led_mask, sensor_matrix)
-
-def activate_leds_from_matrix(led_mask):
+def run_collection_loop(led_mask, num_runs=1, session=None):
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        saved = 0
+        for i in range(num_runs):
+            print(f"\n🔁 Sample {i + 1}/{num_runs}")
+            sensor_matrix = collect_sensor_matrix(session=sensor)
+            saved += save_sample(led_mask, sensor_matrix, STORE_PATH)
+            plot_overlay(led_mask, sensor_matrix)
+    print(f"📦 {saved}/{num_runs} samples saved to {STORE_PATH}.")
+    return saved
+
+def activate_leds_from_matrix(led_mask, session=None):
     """Use LOX commands only for visual confirmation (if needed)."""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    for row in range(NUM_ROWS):
-        for col in range(NUM_COLS):
-            if led_mask[row, col] == 1:
-                cmd = f'LOX{row + 1}{col + 1}\n'.encode()
-                print(f"🔆 Turning ON LED at Row {row + 1}, Col {col + 1}")
-                ser.write(cmd)
-                time.sleep(0.05)
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        for row, col in zip(*np.nonzero(led_mask == 1)):
+            print(f"🔆 Turning ON LED at Row {row + 1}, Col {col + 1}")
+        sensor.set_leds(led_mask == 1)
 
-    time.sleep(1)
-    ser.write(b'LAF\n')
-    ser.close()
+        time.sleep(1)
+        sensor.command('LAF')
 
 # === Main Execution ===
 if __name__ == "__main__":
-    activate_leds_from_matrix(LED_MASK)  # Optional visual confirm
-    time.sleep(1)
-    run_collection_loop(LED_MASK, NUM_ITERATIONS)
+    with SensorSession(COM_PORT, BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+        activate_leds_from_matrix(LED_MASK, session)  # Optional visual confirm
+        time.sleep(1)
+        run_collection_loop(LED_MASK, NUM_ITERATIONS, session)
@@ -1,20 +1,23 @@
-import pandas as pd
-import numpy as np
+import os
 import matplotlib.pyplot as plt
 
-df = pd.read_csv('../dataset.csv')
+from cnn_model.sample_index import SampleIndex
+from cnn_model.sample_store import SampleStore, import_csv
 
-X_cols = [f'X{i}' for i in range(25)]
-Y_cols = [f'Y{i}' for i in range(25)]
+STORE_PATH = '../dataset_store'  # Sample store directory (see sample_store.py)
+LEGACY_CSV = '../dataset.csv'    # Imported into an empty store once
 
-# Group by unique object positions
-unique_positions = df[X_cols].drop_duplicates()
+store = SampleStore(STORE_PATH)
+if not len(store) and os.path.exists(LEGACY_CSV):
+    print(f"📦 Importing {import_csv(LEGACY_CSV, STORE_PATH)} samples from {LEGACY_CSV} into {STORE_PATH}")
+sensors, _, _ = store.load()
 
-for idx, pos in unique_positions.iterrows():
-    mask = (df[X_cols] == pos.values).all(axis=1)
-    avg_Y = df.loc[mask, Y_cols].mean().values.reshape(5,5)
+# Group by unique object positions; the grid shape comes from the store
+index = SampleIndex.from_store(store)
+avg_Y, _ = index.class_stats(sensors)
 
-    plt.imshow(avg_Y, cmap='viridis')
-    plt.title(f'Avg Sensor Output for Position {idx+1}')
+for class_id in range(index.num_classes):
+    plt.imshow(avg_Y[class_id], cmap='viridis')
+    plt.title(f'Avg Sensor Output for Position {class_id + 1} ({index.class_counts()[class_id]} samples)')
     plt.colorbar()
     plt.show()
@@ -1,16 +1,16 @@
-import serial
 import time
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-import os
+
+from cnn_model.sample_store import save_sample
+from cnn_model.sensor_session import SensorSession, borrow_session
 
 # Configuration
 COM_PORT = 'COM3'
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-CSV_PATH = '../dataset.csv'
+STORE_PATH = '../dataset_store'  # Sample store directory (see sample_store.py)
 NUM_ITERATIONS = 20
 
 # Ground truth matrix (you can update as needed)
@@ -26,58 +26,19 @@ X = np.array([
 
 
 
-def collect_sensor_matrix():
+def collect_sensor_matrix(session=None):
     """Activates LEDs and reads 5x5 sensor matrix from serial."""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    # 🔆 Turn on ALL LEDs (LOX11 to LOX55)
-    for row in range(1, NUM_ROWS + 1):
-        for col in range(1, NUM_COLS + 1):
-            cmd = f'LOX{row}{col}\n'.encode()
-            ser.write(cmd)
-            time.sleep(0.02)
-
-    time.sleep(5)
-    # 🟢 Now collect photodiode matrix
-    matrix = np.zeros((NUM_ROWS, NUM_COLS))
-    for row in range(1, NUM_ROWS + 1):
-        for col in range(1, NUM_COLS + 1):
-            cmd = f'DON{row}{col}\n'.encode()
-            ser.write(cmd)
-            line = ser.readline().decode().strip()
-            print(line)
-            try:
-                val = float(line.split(',')[-1])
-            except:
-                val = 0
-            matrix[row - 1, col - 1] = val
-            time.sleep(0.1)
-
-    ser.close()
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        # 🔆 Turn on ALL LEDs (LOX11 to LOX55)
+        sensor.set_leds(np.ones((NUM_ROWS, NUM_COLS)))
+
+        time.sleep(5)
+        # 🟢 Now collect photodiode matrix
+        matrix = sensor.scan_photodiodes()
+    print(matrix)
     return matrix
 
 
-
-def save_sample_to_csv(X, Y, path=CSV_PATH):
-    """Saves one sample (flattened X and Y) to a CSV file."""
-    X_flat = X.flatten()
-    Y_flat = Y.flatten()
-    sample = np.concatenate((X_flat, Y_flat))
-
-    column_names = [f'X{i}' for i in range(25)] + [f'Y{i}' for i in range(25)]
-
-    if not os.path.exists(path):
-        df = pd.DataFrame([sample], columns=column_names)
-        df.to_csv(path, index=False)
-        print("✅ Created new dataset.csv and saved sample.")
-    else:
-        df = pd.read_csv(path)
-        df.loc[len(df)] = sample
-        df.to_csv(path, index=False)
-        print("✅ Appended new sample to dataset.csv.")
-
-
 def plot_overlay(X, Y):
     """Shows sensor reading with ground truth object overlay."""
     fig, ax = plt.subplots()
@@ -104,32 +65,25 @@ def plot_overlay(X, Y):
     plt.show()
 
 
-def run_collection_loop(X, num_runs=20):
+def run_collection_loop(X, num_runs=20, session=None):
     """Main loop to collect multiple samples."""
-    for i in range(num_runs):
-        print(f"\n🔁 Sample {i + 1}/{num_runs}")
-        Y = collect_sensor_matrix()
-        save_sample_to_csv(X, Y)
-        plot_overlay(X, Y)
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        for i in range(num_runs):
+            print(f"\n🔁 Sample {i + 1}/{num_runs}")
+            Y = collect_sensor_matrix(sensor)
+            save_sample(X, Y, STORE_PATH)
+            plot_overlay(X, Y)
 
 
-def activate_leds_from_matrix(X):
+def activate_leds_from_matrix(X, session=None):
     """Takes a 5x5 numpy array (X) and turns ON LEDs where X[row, col] == 1"""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    for row in range(NUM_ROWS):
-        for col in range(NUM_COLS):
-            if X[row, col] == 1:
-                # Convert to 1-based indexing for LOXxy
-                cmd = f'LOX{row + 1}{col + 1}\n'.encode()
-                print(f"🔆 Turning ON LED at Row {row+1}, Col {col+1}")
-                ser.write(cmd)
-                time.sleep(0.05)  # Allow time for shift register to latch
-
-    ser.close()
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        for row, col in zip(*np.nonzero(X == 1)):
+            print(f"🔆 Turning ON LED at Row {row+1}, Col {col+1}")
+        sensor.set_leds(X == 1)
 
 if __name__ == "__main__":
-    activate_leds_from_matrix(X)
-    time.sleep(2)
-    run_collection_loop(X, NUM_ITERATIONS)
\ No newline at end of file
+    with SensorSession(COM_PORT, BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+        activate_leds_from_matrix(X, session)
+        time.sleep(2)
+        run_collection_loop(X, NUM_ITERATIONS, session)
@@ -7,6 +7,7 @@ from sklearn.model_selection import train_test_split
 import os
 import pickle
 from cnn_model.method_two_data import collect_sensor_matrix
+from cnn_model.sample_index import SampleIndex
 
 
 # Constants
@@ -20,21 +21,17 @@ MODEL_FILE = '../cnn_model.h5'
 def load_data(path='dataset.csv'):
     df = pd.read_csv(path)
     X = df[Y_COLUMNS].values.reshape(-1, NUM_ROWS, NUM_COLS, 1)  # CNN expects 4D input
-    y_raw = df[X_COLUMNS].values
 
-    # Convert binary mask to class index (e.g., string to int label)
-    y_labels = np.array([''.join(str(int(v)) for v in row) for row in y_raw])
-    unique_labels = sorted(np.unique(y_labels))
-    label_to_idx = {label: idx for idx, label in enumerate(unique_labels)}
-    y = np.array([label_to_idx[label] for label in y_labels])
-
-    y = to_categorical(y, num_classes=len(unique_labels))
+    # Binary mask -> class index via the placement index (same ids as sorted '0101...' labels)
+    index = SampleIndex(df[X_COLUMNS].values.reshape(-1, NUM_ROWS, NUM_COLS))
+    label_to_idx = index.label_mapping()
+    y = to_categorical(index.class_ids, num_classes=index.num_classes)
 
     # Save label mapping for future predictions
     with open(LABEL_MAP_FILE, 'wb') as f:
         pickle.dump(label_to_idx, f)
 
-    return train_test_split(X, y, test_size=0.2, random_state=42), len(unique_labels)
+    return train_test_split(X, y, test_size=0.2, random_state=42), index.num_classes
 
 
 def build_cnn_model(num_classes):
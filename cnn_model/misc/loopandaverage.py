@@ -1,19 +1,22 @@
 #this code will looop over all leds one by one and on each led it will take all diode values then at the end average them
 
-import serial
 import time
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-import os
+
+from cnn_model.sample_store import save_sample
+from cnn_model.sensor_session import SensorSession, borrow_session
+from cnn_model.sequential_average import scan_full_until_confident
 
 # Configuration
 COM_PORT = 'COM3'
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-CSV_PATH = '../dataset.csv'
+STORE_PATH = '../dataset_store'  # Sample store directory (see sample_store.py)
 NUM_ITERATIONS = 1
+MAX_READS = 5      # Upper bound on repeated reads per LED/diode pair
+CI_WIDTH = 2.0     # Stop re-reading a pair once its 95 % confidence interval is this narrow
 
 # Ground truth matrix (adjust based on object position)
 X = np.array([
@@ -25,73 +28,25 @@ X = np.array([
 ])
 
 
-def collect_sensor_matrix():
-    """Turns on each LED one-by-one, reads all 25 diodes, then turns LED off."""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    NUM_LEDS = 25
-    readings = np.zeros((NUM_LEDS, NUM_ROWS, NUM_COLS))
-
-    for led_index in range(1, NUM_LEDS + 1):
-        row = (led_index - 1) // 5 + 1
-        col = (led_index - 1) % 5 + 1
-
-        # 🔆 Turn ON LED
-        ser.reset_input_buffer()
-        on_cmd = f'LOX{row}{col}\n'.encode()
-        ser.write(on_cmd)
-        time.sleep(0.1)
-
-        # 🔎 Read from 25 diodes
-        for diode_row in range(1, NUM_ROWS + 1):
-            for diode_col in range(1, NUM_COLS + 1):
-                ser.reset_input_buffer()
-                d_cmd = f'DON{diode_row}{diode_col}\n'.encode()
-                ser.write(d_cmd)
-                time.sleep(0.02)
-
-                line = ser.readline().decode(errors='ignore').strip()
-                print(f"LED {row}{col} — {line}")
-                try:
-                    val = float(line.split(',')[-1])
-                except:
-                    val = 0
-                readings[led_index - 1, diode_row - 1, diode_col - 1] = val
-                time.sleep(0.005)
-
-        # 🔻 Turn OFF LED
-        ser.reset_input_buffer()
-        off_cmd = f'LOF{row}{col}\n'.encode()
-        ser.write(off_cmd)
-        time.sleep(0.05)
-
-    ser.close()
+def collect_sensor_matrix(session=None, return_variance=False):
+    """
+    Turns on each LED one-by-one, reads all 25 diodes (re-reading noisy pairs until
+    confident), then averages the diode maps over LEDs.
+    """
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        readings, variance, count = scan_full_until_confident(sensor, ci_width=CI_WIDTH, max_reads=MAX_READS)
 
     # Final result
-    matrix = np.mean(readings, axis=0)
+    matrix = np.mean(readings, axis=0).reshape(NUM_ROWS, NUM_COLS)
+    # Pairs that never got a valid read have NaN means; keep their variance NaN too
+    mean_variance = np.divide(variance, count, out=np.full_like(variance, np.nan), where=count > 0)
+    matrix_variance = (mean_variance.sum(axis=0) / len(readings) ** 2).reshape(NUM_ROWS, NUM_COLS)
+    print(f"📊 Largest diode std after averaging: {np.sqrt(np.nanmax(matrix_variance)):.2f}")
+    if return_variance:
+        return matrix, matrix_variance
     return matrix
 
 
-def save_sample_to_csv(X, Y, path=CSV_PATH):
-    """Saves one sample (flattened X and Y) to a CSV file."""
-    X_flat = X.flatten()
-    Y_flat = Y.flatten()
-    sample = np.concatenate((X_flat, Y_flat))
-
-    column_names = [f'X{i}' for i in range(25)] + [f'Y{i}' for i in range(25)]
-
-    if not os.path.exists(path):
-        df = pd.DataFrame([sample], columns=column_names)
-        df.to_csv(path, index=False)
-        print("✅ Created new dataset.csv and saved sample.")
-    else:
-        df = pd.read_csv(path)
-        df.loc[len(df)] = sample
-        df.to_csv(path, index=False)
-        print("✅ Appended new sample to dataset.csv.")
-
-
 def plot_overlay(X, Y):
     """Visualizes Y and overlays object position from X."""
     fig, ax = plt.subplots()
@@ -118,32 +73,25 @@ def plot_overlay(X, Y):
     plt.show()
 
 
-def run_collection_loop(X, num_runs=1):
+def run_collection_loop(X, num_runs=1, session=None):
     """Main loop to collect multiple samples."""
-    for i in range(num_runs):
-        print(f"\n🔁 Sample {i + 1}/{num_runs}")
-        Y = collect_sensor_matrix()
-        save_sample_to_csv(X, Y)
-        plot_overlay(X, Y)
-        input("➡️ Press Enter to capture next sample...")
-
-def activate_leds_from_matrix(X):
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        for i in range(num_runs):
+            print(f"\n🔁 Sample {i + 1}/{num_runs}")
+            Y = collect_sensor_matrix(sensor)
+            save_sample(X, Y, STORE_PATH)
+            plot_overlay(X, Y)
+            input("➡️ Press Enter to capture next sample...")
+
+def activate_leds_from_matrix(X, session=None):
     """Takes a 5x5 numpy array (X) and turns ON LEDs where X[row, col] == 1"""
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-
-    for row in range(NUM_ROWS):
-        for col in range(NUM_COLS):
-            if X[row, col] == 1:
-                # Convert to 1-based indexing for LOXxy
-                cmd = f'LOX{row + 1}{col + 1}\n'.encode()
-                print(f"🔆 Turning ON LED at Row {row+1}, Col {col+1}")
-                ser.write(cmd)
-                time.sleep(0.05)  # Allow time for shift register to latch
-
-    ser.close()
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        for row, col in zip(*np.nonzero(X == 1)):
+            print(f"🔆 Turning ON LED at Row {row+1}, Col {col+1}")
+        sensor.set_leds(X == 1)
 
 if __name__ == "__main__":
-    activate_leds_from_matrix(X)
-    time.sleep(2)
-    run_collection_loop(X, NUM_ITERATIONS)
+    with SensorSession(COM_PORT, BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+        activate_leds_from_matrix(X, session)
+        time.sleep(2)
+        run_collection_loop(X, NUM_ITERATIONS, session)
@@ -1,6 +1,7 @@
-import serial
 import time
 
+from cnn_model.sensor_session import SensorSession
+
 # === CONFIGURATION ===
 COM_PORT = 'COM3'      # Change to your COM port
 BAUD_RATE = 115200
@@ -11,33 +12,24 @@ NUM_COLS = 5
 TARGET_LED_ROW = 1     # 1 = top row, 5 = bottom row (depending on hardware layout)
 TARGET_LED_COL = 1     # 1 = leftmost column, 5 = rightmost
 
-def open_serial():
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-    return ser
-
-def turn_on_led(ser, row, col):
+def turn_on_led(session, row, col):
     """Send command to turn ON a specific LED and leave it on."""
-    cmd = f'LOX{row}{col}\n'.encode()
     print(f"🔆 Turning ON LED at Row {row}, Col {col}")
-    ser.write(cmd)
+    session.command(f'LOX{session.address(row, col)}')
 
-def turn_off_all_leds(ser):
+def turn_off_all_leds(session):
     """Turn off all LEDs."""
-    ser.write(b'LAF\n')
+    session.command('LAF')
     print("🟢 All LEDs turned OFF.")
 
 def main():
-    ser = open_serial()
-    try:
-        turn_off_all_leds(ser)
-        turn_on_led(ser, TARGET_LED_ROW, TARGET_LED_COL)
+    with SensorSession(COM_PORT, BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as session:
+        turn_off_all_leds(session)
+        turn_on_led(session, TARGET_LED_ROW, TARGET_LED_COL)
         print("🕒 LED will stay ON for 10 seconds...")
         time.sleep(10)
-        turn_off_all_leds(ser)
-    finally:
-        ser.close()
-        print("🔌 Serial connection closed.")
+        turn_off_all_leds(session)
+    print("🔌 Serial connection closed.")
 
 if __name__ == "__main__":
     main()
@@ -1,64 +1,37 @@
-import serial
-import time
 import numpy as np
 import matplotlib.pyplot as plt
 
+from cnn_model.sensor_session import borrow_session
+from cnn_model.sequential_average import scan_full_until_confident
+
 # === CONFIGURATION ===
 COM_PORT = 'COM3'        # Update this to your actual port
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-READ_DELAY = 0.1
-REPEAT_COUNT = 1
-
-# === PREPARE COMMANDS ===
-led_commands = [f'LOX{r}{c}' for r in range(1, NUM_ROWS + 1) for c in range(1, NUM_COLS + 1)]
-pd_commands = [f'DON{r}{c}' for r in range(1, NUM_ROWS + 1) for c in range(1, NUM_COLS + 1)]
-
-# === PARSE VALUE FUNCTION ===
-def parse_value(line):
-    try:
-        return float(line.split(',')[-1])
-    except:
-        return 0
-
-# === READ FULL PD MATRIX FOR A GIVEN LED ===
-def get_pd_matrix_for_led(ser, led_cmd):
-    matrix = np.zeros((NUM_ROWS, NUM_COLS))
-    ser.write(f'{led_cmd}\n'.encode())
-    time.sleep(READ_DELAY)
-
-    for pd_cmd in pd_commands:
-        ser.write(f'{pd_cmd}\n'.encode())
-        line = ser.readline().decode().strip()
-        print(line)
-        val = parse_value(line)
-        x = int(pd_cmd[3]) - 1
-        y = int(pd_cmd[4]) - 1
-        matrix[x, y] = val
-        time.sleep(READ_DELAY)
-
-    return matrix
-
-# === COLLECT SUM OF ALL LED ACTIVATIONS ===
-def collect_average_pd_matrix():
-    ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)
-    total_matrix = np.zeros((NUM_ROWS, NUM_COLS))
-
-    for led_cmd in led_commands:
-        print(f"Activating {led_cmd}")
-        for _ in range(REPEAT_COUNT):
-            pd_matrix = get_pd_matrix_for_led(ser, led_cmd)
-            total_matrix += pd_matrix
-
-    ser.close()
-    average_matrix = total_matrix / (NUM_ROWS * NUM_COLS)
-    return average_matrix
+REPEAT_COUNT = 5   # Upper bound on reads per LED/PD pair; quiet pairs stop earlier
+CI_WIDTH = 2.0     # Target 95 % confidence interval width per pair (ADC counts)
+
+# === COLLECT AVERAGE OF ALL LED ACTIVATIONS ===
+def collect_average_pd_matrix(session=None):
+    """
+    Light each LED in turn, read all PDs until each pair is confident (or REPEAT_COUNT reads),
+    and average the PD maps over LEDs. Returns (average, variance of the average), both 5x5.
+    """
+    with borrow_session(session, COM_PORT, baud_rate=BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS) as sensor:
+        mean, variance, count = scan_full_until_confident(sensor, ci_width=CI_WIDTH, max_reads=REPEAT_COUNT)
+
+    num_leds = mean.shape[0]
+    average_matrix = mean.mean(axis=0)
+    # Pairs that never got a valid read have NaN means; keep their variance NaN too
+    mean_variance = np.divide(variance, count, out=np.full_like(variance, np.nan), where=count > 0)
+    average_variance = mean_variance.sum(axis=0) / num_leds ** 2
+    return average_matrix.reshape(NUM_ROWS, NUM_COLS), average_variance.reshape(NUM_ROWS, NUM_COLS)
 
 # === RUN AND VISUALIZE ===
 # Uncomment for real hardware
-avg_matrix = collect_average_pd_matrix()
+avg_matrix, avg_variance = collect_average_pd_matrix()
+print(f"📊 Largest std of the averaged PD map: {np.sqrt(np.nanmax(avg_variance)):.2f}")
 
 # Placeholder simulation
 #np.random.seed(42)
@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cnn_model.live_acquisition import AcquisitionThread, RING_CAPACITY, WAIT_TIMEOUT
+from cnn_model.sensor_session import SensorSession
+
+# Configuration
+COM_PORTS = ['COM3', 'COM4']  # One entry per board ('VIRTUAL' entries run simulated boards)
+SCAN_MODE = 'diagonal'        # 'diagonal' -> (boards, 25), 'full' -> (boards, 25, 25)
+MAX_SKEW = 1.0                # Frames further apart than this (seconds) are not stacked together
+RUN_SECONDS = 10.0
+
+
+class MultiBoardAcquisition:
+    """
+    Drives several LED/photodiode boards at once: one SensorSession and one
+    AcquisitionThread per port, so every board scans back-to-back on its own worker and
+    only its serial link limits it. Frames are matched across boards by timestamp and
+    returned stacked as a (boards, 25, ...) array.
+
+        with MultiBoardAcquisition(['COM3', 'COM4']) as boards:
+            for frames, timestamps in boards.frames(max_frames=100):
+                ...
+    """
+
+    def __init__(self, ports=COM_PORTS, scan_mode=SCAN_MODE, capacity=RING_CAPACITY, **session_kwargs):
+        self.ports = list(ports)
+        self.scan_mode = scan_mode
+        self.capacity = capacity
+        self.sessions = [SensorSession(port, **session_kwargs) for port in self.ports]
+        self.workers = []
+        self.started_at = None
+
+    @property
+    def frame_shape(self):
+        num_cells = self.sessions[0].num_rows * self.sessions[0].num_cols
+        return (num_cells,) if self.scan_mode == 'diagonal' else (num_cells, num_cells)
+
+    def _scan_for(self, session):
+        if self.scan_mode == 'diagonal':
+            return lambda: session.scan_diagonal().reshape(-1)
+        return session.scan_full
+
+    # === Lifecycle ===
+    def start(self):
+        # Every board needs its ~2 s auto-reset handshake; do them in parallel
+        with ThreadPoolExecutor(len(self.sessions)) as pool:
+            opening = [pool.submit(session.open) for session in self.sessions]
+        errors = [(port, future.exception()) for port, future in zip(self.ports, opening) if future.exception()]
+        if errors:
+            for session in self.sessions:  # __exit__ does not run after a failed __enter__
+                session.close()
+            port, error = errors[0]
+            raise RuntimeError(f"Board on {port} failed to open") from error
+        self.workers = [AcquisitionThread(self._scan_for(session), self.frame_shape, self.capacity)
+                        for session in self.sessions]
+        self.started_at = time.time()
+        for worker in self.workers:
+            worker.start()
+        return self
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        for session in self.sessions:
+            session.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # === Frames ===
+    def _check_workers(self):
+        for port, worker in zip(self.ports, self.workers):
+            if worker.error is not None:
+                raise RuntimeError(f"Board on {port} stopped") from worker.error
+
+    def latest_aligned(self, max_skew=MAX_SKEW):
+        """
+        Newest set of frames, one per board, closest in time to the board that is furthest
+        behind. Returns (frames (boards, ...), timestamps (boards,)), or None if a board
+        has no frame yet or the boards are more than max_skew seconds apart.
+        """
+        self._check_workers()
+        newest = [worker.buffer.latest() for worker in self.workers]
+        if any(item is None for item in newest):
+            return None
+        reference = min(timestamp for _, timestamp, _ in newest)
+
+        frames = np.empty((len(self.workers),) + self.frame_shape, dtype=np.float32)
+        timestamps = np.empty(len(self.workers))
+        for board, worker in enumerate(self.workers):
+            recent, stamps = worker.buffer.recent(self.capacity)
+            closest = np.argmin(np.abs(stamps - reference))
+            frames[board] = recent[closest]
+            timestamps[board] = stamps[closest]
+        if timestamps.max() - timestamps.min() > max_skew:
+            return None
+        return frames, timestamps
+
+    def frames(self, max_frames=None, max_skew=MAX_SKEW):
+        """Yield stacked, time-aligned frames each time every board has produced a new one."""
+        last_seq = [0] * len(self.workers)
+        produced = 0
+        while max_frames is None or produced < max_frames:
+            for board, worker in enumerate(self.workers):
+                while worker.buffer.wait_for_new(last_seq[board], WAIT_TIMEOUT) is None:
+                    self._check_workers()
+                last_seq[board] = worker.buffer.count
+            aligned = self.latest_aligned(max_skew)
+            if aligned is None:
+                print("⚠️ Boards drifted apart, skipping this set")
+                continue
+            produced += 1
+            yield aligned
+
+    @property
+    def frames_per_second(self):
+        """Aggregate frames per second over all boards since start()."""
+        elapsed = time.time() - self.started_at
+        return sum(worker.buffer.count for worker in self.workers) / elapsed if elapsed > 0 else 0.0
+
+
+# === Main ===
+if __name__ == "__main__":
+    with MultiBoardAcquisition(COM_PORTS) as boards:
+        time.sleep(RUN_SECONDS)
+        stacked, timestamps = boards.latest_aligned()
+        print(f"📦 Stacked frames: {stacked.shape}, skew {np.ptp(timestamps) * 1000:.0f} ms")
+        for port, worker in zip(boards.ports, boards.workers):
+            print(f"🔌 {port}: {worker.buffer.count} frames")
+        print(f"⏱️ Aggregate {boards.frames_per_second:.2f} frames/s over {len(boards.ports)} board(s)")
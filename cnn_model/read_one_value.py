@@ -1,22 +1,21 @@
-import serial
 import json
 import time
 
-ser = serial.Serial("COM3", 115200, timeout=1)
-time.sleep(2)
+from cnn_model.sensor_session import SensorSession
 
-# Example: Read value when LED(1,1) and PD(1,1) are active
-ser.write(b'LOX11\n')
-time.sleep(0.1)
-ser.write(b'DON11\n')
-time.sleep(0.1)
-ser.write(b'GETVAL\n')
+with SensorSession("COM3", 115200) as session:
+    # Example: Read value when LED(1,1) and PD(1,1) are active
+    session.command('LOX11')
+    time.sleep(0.1)
+    session.command('DON11')
+    time.sleep(0.1)
+    line = session.command('GETVAL')
 
-line = ser.readline().decode().strip()
-try:
-    data = json.loads(line)
-    print(f"LED: {data['LED']}, PD: {data['PD']}, Value: {data['val']}")
-except json.JSONDecodeError:
-    print("❌ Failed to parse:", line)
-
-ser.close()
+if line is None:
+    print("❌ No reply to GETVAL (timed out)")
+else:
+    try:
+        data = json.loads(line)
+        print(f"LED: {data['LED']}, PD: {data['PD']}, Value: {data['val']}")
+    except (json.JSONDecodeError, KeyError, TypeError):
+        print("❌ Failed to parse:", line)
@@ -0,0 +1,172 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cnn_model.grid import NUM_COLS, NUM_ROWS, value_columns
+
+# Configuration
+SESSION_GAP = 600.0   # Seconds between two samples that start a new recording session
+MAX_MASK_BITS = 62    # Masks are packed into one int64 key
+
+#
+# Masks are packed into int64 keys (first cell = most significant bit, so key order
+# matches the sorted '0101...' labels) and samples are sorted by key once.
+#
+
+
+def encode_masks(masks):
+    """(N, ...) binary masks -> (N,) int64 keys, first cell as the most significant bit."""
+    bits = np.asarray(masks).reshape(len(masks), -1) > 0
+    if bits.shape[1] > MAX_MASK_BITS:
+        raise ValueError(f"Masks of {bits.shape[1]} cells do not fit a {MAX_MASK_BITS}-bit key")
+    weights = np.left_shift(np.int64(1), np.arange(bits.shape[1] - 1, -1, -1, dtype=np.int64))
+    return bits.astype(np.int64) @ weights
+
+
+def mask_string(key, num_cells=NUM_ROWS * NUM_COLS):
+    """Key -> the '0101...' label string used by the classifier's label mapping."""
+    return format(int(key), f'0{num_cells}b')
+
+
+def sessions_from_timestamps(timestamps, gap=SESSION_GAP):
+    """Session number per sample: a new session starts after a pause longer than gap seconds."""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    order = np.argsort(timestamps, kind='stable')
+    starts = np.diff(timestamps[order], prepend=-np.inf) > gap
+    sessions = np.empty(len(timestamps), dtype=np.int64)
+    sessions[order] = np.cumsum(starts) - 1
+    return sessions
+
+
+class _Groups:
+    """Sample positions grouped by label: O(1) lookup of a group's samples as an array slice."""
+
+    def __init__(self, labels):
+        self.keys, self.ids, counts = np.unique(np.asarray(labels), return_inverse=True, return_counts=True)
+        self.ids = self.ids.reshape(-1)
+        self.order = np.argsort(self.ids, kind='stable')
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+        self.lookup = {key: i for i, key in enumerate(self.keys.tolist())}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def members(self, group_id):
+        return self.order[self.starts[group_id]:self.starts[group_id + 1]]
+
+    def get(self, key):
+        group_id = self.lookup.get(key)
+        return self.order[:0] if group_id is None else self.members(group_id)
+
+
+class SampleIndex:
+    """Samples grouped by object placement (encoded mask / class id), workbook and session."""
+
+    def __init__(self, masks, workbooks=None, sessions=None):
+        self.mask_shape = np.shape(masks)[1:]
+        self.mask_keys = encode_masks(masks)
+        self.placements = _Groups(self.mask_keys)
+        self.class_ids = self.placements.ids         # 0..num_classes-1 in sorted label order
+        self.workbooks = None if workbooks is None else _Groups(workbooks)
+        self.sessions = None if sessions is None else _Groups(sessions)
+
+    def __len__(self):
+        return len(self.mask_keys)
+
+    @property
+    def num_classes(self):
+        return len(self.placements)
+
+    def class_counts(self):
+        return np.diff(self.placements.starts)
+
+    def label_mapping(self):
+        """{'0101...': class id}, the mapping the classifier stores next to its model."""
+        num_cells = int(np.prod(self.mask_shape))
+        return {mask_string(key, num_cells): i for i, key in enumerate(self.placements.keys)}
+
+    def class_mask(self, class_id):
+        """Binary mask of one class, in the original mask shape."""
+        num_cells = int(np.prod(self.mask_shape))
+        return np.array(list(mask_string(self.placements.keys[class_id], num_cells)), dtype=np.uint8).reshape(
+            self.mask_shape)
+
+    def placement(self, mask):
+        """Positions of every sample recorded with this object mask (empty if never seen)."""
+        return self.placements.get(int(encode_masks(np.asarray(mask)[None])[0]))
+
+    def of_class(self, class_id):
+        return self.placements.members(class_id)
+
+    def of_workbook(self, workbook):
+        if self.workbooks is None:
+            raise ValueError("Index was built without workbook keys (pass workbooks= or workbook_column=)")
+        return self.workbooks.get(workbook)
+
+    def of_session(self, session):
+        if self.sessions is None:
+            raise ValueError("Index was built without session keys (use from_store or pass sessions=)")
+        return self.sessions.get(session)
+
+    def class_stats(self, values):
+        """(mean, variance) frames per class: (num_classes, *frame shape) float64 each."""
+        values = np.asarray(values)
+        flat = values.reshape(len(values), -1)[self.placements.order].astype(np.float64)
+        starts = self.placements.starts[:-1]
+        counts = self.class_counts()[:, None]
+        mean = np.add.reduceat(flat, starts, axis=0) / counts
+        variance = np.add.reduceat(flat ** 2, starts, axis=0) / counts - mean ** 2
+        shape = (self.num_classes,) + values.shape[1:]
+        return mean.reshape(shape), np.maximum(variance, 0).reshape(shape)
+
+    def stratified_batches(self, batch_size, seed=None, samples=None):
+        """
+        Endless index batches drawing every class equally often: each slot picks a class
+        uniformly, then a sample of that class. samples restricts the draw (e.g. train split).
+        """
+        rng = np.random.default_rng(seed)
+        groups = self.placements if samples is None else _Groups(self.mask_keys[samples])
+        positions = np.arange(len(self)) if samples is None else np.asarray(samples)
+        counts = np.diff(groups.starts)
+        while True:
+            classes = rng.integers(len(groups), size=batch_size)
+            offsets = groups.starts[classes] + (rng.random(batch_size) * counts[classes]).astype(np.int64)
+            yield positions[groups.order[offsets]]
+
+    @classmethod
+    def from_frame(cls, df, mask_prefix='X', num_rows=NUM_ROWS, num_cols=NUM_COLS, workbook_column=None,
+                   session_column=None):
+        """Index a dataset.csv-style DataFrame (mask columns X0..X24)."""
+        masks = df[value_columns(mask_prefix, num_rows, num_cols)].values.reshape(-1, num_rows, num_cols)
+        workbooks = None if workbook_column is None else df[workbook_column].values
+        sessions = None if session_column is None else df[session_column].values
+        return cls(masks, workbooks, sessions)
+
+    @classmethod
+    def from_store(cls, store, gap=SESSION_GAP):
+        """Index a SampleStore; sessions are split at pauses longer than gap seconds between timestamps."""
+        _, masks, timestamps = store.load()
+        return cls(masks, sessions=sessions_from_timestamps(timestamps, gap))
+
+
+# === Main: index dataset.csv and compare with the per-position scan ===
+if __name__ == "__main__":
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset - Rcopy.csv')
+    df = pd.read_csv(path)
+    start = time.perf_counter()
+    index = SampleIndex.from_frame(df)
+    mean, variance = index.class_stats(df[value_columns('Y')].values.reshape(-1, NUM_ROWS, NUM_COLS))
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    x_cols = value_columns('X')
+    for _, pos in df[x_cols].drop_duplicates().iterrows():
+        df.loc[(df[x_cols] == pos.values).all(axis=1), value_columns('Y')].mean()
+    scan_time = time.perf_counter() - start
+
+    batch = next(index.stratified_batches(32, seed=0))
+    print(f"✅ {len(index)} samples, {index.num_classes} placements (largest {index.class_counts().max()} samples)")
+    print(f"⏱️ Index + per-class mean/variance: {indexed_time * 1000:.1f} ms, per-position scans: "
+          f"{scan_time * 1000:.1f} ms; stratified batch covers {len(np.unique(index.class_ids[batch]))} classes")
@@ -0,0 +1,214 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cnn_model.grid import NUM_COLS, NUM_ROWS, value_columns
+
+# Configuration
+STORE_PATH = 'dataset_store'   # Directory holding index.json and chunk_*.samples
+CHUNK_SIZE = 4096              # Samples per chunk file
+LOCK_TIMEOUT = 10.0            # Seconds a writer waits for the lock
+LOCK_POLL = 0.01
+STALE_LOCK = 60.0              # A lock file older than this is left over from a crashed writer
+STORE_VERSION = 1
+
+#
+# Fixed-size binary records in chunk files plus a small JSON index holding the valid
+# count; writers serialise on an O_EXCL lock file.
+#
+
+
+def save_json(path, data):
+    """Write data as JSON to path atomically: readers see the old or the new file, never half of one."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def sample_dtype(sensor_shape, mask_shape):
+    """One stored sample: when, the photodiode readings and the ground-truth object mask."""
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('sensors', '<f4', tuple(sensor_shape)),
+        ('mask', 'u1', tuple(mask_shape)),
+    ])
+
+
+class StoreLock:
+    """Exclusive lock file created with O_CREAT | O_EXCL; removes stale locks of crashed writers."""
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def _try_create(self, path):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _is_stale(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) > STALE_LOCK
+        except FileNotFoundError:
+            return False
+
+    def _break_stale(self):
+        """Remove a stale lock and take it, or return False (contention)."""
+        breaker = self.path + '.break'
+        if self._is_stale(breaker):   # a writer crashed while breaking the lock
+            try:
+                os.remove(breaker)
+            except FileNotFoundError:
+                pass
+        if not self._try_create(breaker):
+            return False
+        try:
+            # Recheck under the breaker: another writer may have replaced the stale lock already
+            if not self._is_stale(self.path):
+                return False
+            os.remove(self.path)
+            return self._try_create(self.path)
+        finally:
+            os.remove(breaker)
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while not self._try_create(self.path):
+            if self._is_stale(self.path) and self._break_stale():
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Sample store locked by another writer: {self.path}")
+            time.sleep(LOCK_POLL)
+        return self
+
+    def __exit__(self, *exc):
+        os.remove(self.path)
+
+
+class SampleStore:
+    """Append-only chunked sample store; load() returns whole columns as NumPy arrays."""
+
+    def __init__(self, path=STORE_PATH, sensor_shape=(NUM_ROWS, NUM_COLS), mask_shape=(NUM_ROWS, NUM_COLS),
+                 chunk_size=CHUNK_SIZE):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        with StoreLock(self._lock_path):
+            if os.path.exists(self._index_path):
+                index = self._read_index()
+                sensor_shape, mask_shape, chunk_size = index['sensor_shape'], index['mask_shape'], index['chunk_size']
+            else:
+                self._write_index({'version': STORE_VERSION, 'sensor_shape': list(sensor_shape),
+                                   'mask_shape': list(mask_shape), 'chunk_size': chunk_size, 'count': 0})
+        self.sensor_shape = tuple(sensor_shape)
+        self.mask_shape = tuple(mask_shape)
+        self.chunk_size = chunk_size
+        self.dtype = sample_dtype(self.sensor_shape, self.mask_shape)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, 'index.json')
+
+    @property
+    def _lock_path(self):
+        return os.path.join(self.path, 'store.lock')
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.path, f'chunk_{chunk:05d}.samples')
+
+    def _read_index(self):
+        with open(self._index_path) as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        save_json(self._index_path, index)
+
+    def __len__(self):
+        return self._read_index()['count']
+
+    def append(self, sensors, mask, timestamp=None):
+        """Add one sample: sensors (rows, cols) readings and its ground-truth object mask."""
+        return self.append_many(np.asarray(sensors)[None], np.asarray(mask)[None],
+                                None if timestamp is None else [timestamp])
+
+    def append_many(self, sensors, masks, timestamps=None):
+        """Add a batch of samples under a single lock and index update."""
+        records = np.zeros(len(sensors), dtype=self.dtype)
+        records['timestamp'] = time.time() if timestamps is None else timestamps
+        records['sensors'] = np.reshape(sensors, (len(sensors),) + self.sensor_shape)
+        records['mask'] = np.reshape(masks, (len(masks),) + self.mask_shape)
+
+        with StoreLock(self._lock_path):
+            index = self._read_index()
+            count = index['count']
+            written = 0
+            while written < len(records):
+                chunk, offset = divmod(count + written, self.chunk_size)
+                part = records[written:written + self.chunk_size - offset]
+                # Write in place at the record offset: bytes a crashed writer left past `count` are overwritten
+                with open(self._chunk_path(chunk), 'r+b' if os.path.exists(self._chunk_path(chunk)) else 'wb') as f:
+                    f.seek(offset * self.dtype.itemsize)
+                    f.write(part.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                written += len(part)
+            index['count'] = count + written
+            self._write_index(index)
+        return index['count']
+
+    def records(self):
+        """All valid records as one structured array (timestamp, sensors, mask)."""
+        count = len(self)
+        parts = []
+        for chunk in range((count + self.chunk_size - 1) // self.chunk_size):
+            size = min(self.chunk_size, count - chunk * self.chunk_size)
+            parts.append(np.fromfile(self._chunk_path(chunk), dtype=self.dtype, count=size))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=self.dtype)
+
+    def load(self):
+        """(sensors (N, rows, cols) float32, masks (N, rows, cols) uint8, timestamps (N,))."""
+        records = self.records()
+        return records['sensors'], records['mask'], records['timestamp']
+
+
+def save_sample(mask, sensors, path=STORE_PATH):
+    """
+    Append one (object mask, photodiode readings) sample to the store at path. Frames with
+    NaN cells are skipped; returns whether the sample was saved.
+    """
+    if np.isnan(sensors).any():
+        print(f"⚠️ Not saved: {int(np.isnan(sensors).sum())} failed cell(s) in the frame.")
+        return False
+    count = SampleStore(path, np.shape(sensors), np.shape(mask)).append(sensors, mask)
+    print(f"✅ Saved sample {count} to {path}.")
+    return True
+
+
+def import_csv(csv_path, store_path=STORE_PATH, num_rows=NUM_ROWS, num_cols=NUM_COLS):
+    """
+    One-shot import of an existing dataset.csv (Y* = photodiode readings, X* = object
+    mask; either column order) into the sample store. Returns the number of samples added.
+    """
+    df = pd.read_csv(csv_path)
+    sensors = df[value_columns('Y', num_rows, num_cols)].values.astype(np.float32)
+    masks = df[value_columns('X', num_rows, num_cols)].values.round().astype(np.uint8)
+    store = SampleStore(store_path, (num_rows, num_cols), (num_rows, num_cols))
+    if len(df):
+        store.append_many(sensors, masks)
+    return len(df)
+
+
+# === Main: import dataset.csv into the store ===
+if __name__ == "__main__":
+    added = import_csv('dataset.csv')
+    sensors, masks, _ = SampleStore(STORE_PATH).load()
+    print(f"📦 Imported {added} samples; {STORE_PATH} now holds {len(sensors)} samples")
@@ -0,0 +1,181 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from cnn_model.binary_frames import row_timeout
+from cnn_model.command_pipeline import parse_value
+
+# Configuration
+RATE_WINDOW = 20    # Frames averaged by ScanRateTracker
+RETRY_BUDGET = 2.0  # Seconds per frame spent re-reading cells whose reply was lost or garbled
+MAX_RETRIES = 3     # Re-read rounds per frame
+
+# Per-cell quality flags
+QUALITY_OK = 0
+QUALITY_RETRIED = 1   # first read failed, a retry succeeded
+QUALITY_FAILED = 2    # still invalid after the retry budget; the value is NaN
+
+
+class FullFrame:
+    """One LED x PD response matrix with the wall-clock time and quality flag of each cell."""
+
+    def __init__(self, values, timestamps, started_at, duration, quality=None):
+        self.values = values            # (LEDs, PDs) float32, NaN where the read failed
+        self.timestamps = timestamps    # (LEDs, PDs) float64, time.time() seconds
+        self.started_at = started_at
+        self.duration = duration
+        self.quality = np.zeros(values.shape, dtype=np.uint8) if quality is None else quality
+
+    @property
+    def valid(self):
+        return self.quality != QUALITY_FAILED
+
+    @property
+    def frames_per_minute(self):
+        return 60.0 / self.duration if self.duration > 0 else float('inf')
+
+
+class ScanRateTracker:
+    """Running frames-per-minute over the last RATE_WINDOW frames."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.durations = deque(maxlen=window)
+
+    def record(self, frame):
+        self.durations.append(frame.duration)
+
+    @property
+    def frames_per_minute(self):
+        if not self.durations:
+            return 0.0
+        return 60.0 * len(self.durations) / sum(self.durations)
+
+
+def perf_to_wall(perf_time):
+    """Convert a perf_counter() timestamp to time.time() seconds."""
+    return time.time() - (time.perf_counter() - perf_time)
+
+
+def read_pairs(session, pairs, led_settle=None, deadline=None):
+    """
+    Read arbitrary (led, pd) pairs (0-based cell indices), switching each LED once.
+    Returns (values, received perf_counter times); pairs not reached before the
+    perf_counter() deadline, or whose reply failed, are NaN.
+    """
+    num_cols = session.num_cols
+    values = np.full(len(pairs), np.nan)
+    received = np.full(len(pairs), np.nan)
+    by_led = {}
+    for i, (led, pd) in enumerate(pairs):
+        by_led.setdefault(led, []).append((i, pd))
+
+    for led, reads in by_led.items():
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        led_on = session.switch_led(led // num_cols + 1, led % num_cols + 1)
+        pending = [(i, session.queue_read(pd // num_cols + 1, pd % num_cols + 1, not_before=led_on + (
+                    session.led_settle_for(led, pd) if led_settle is None else led_settle)))
+                   for i, pd in reads]
+        for i, reply in pending:
+            values[i] = parse_value(session.pipeline.wait(reply))
+            received[i] = reply.received_at
+    return values, received
+
+
+def retry_failed_cells(values, reread, budget=RETRY_BUDGET, max_retries=MAX_RETRIES):
+    """
+    Re-read only the NaN cells of values (in place) with reread(flat indices, deadline) ->
+    readings, until all are valid, max_retries rounds ran or budget seconds passed.
+    Returns the per-cell quality mask (QUALITY_OK / QUALITY_RETRIED / QUALITY_FAILED).
+    """
+    quality = np.zeros(values.shape, dtype=np.uint8)
+    flat = values.reshape(-1)
+    deadline = time.perf_counter() + budget
+    for _ in range(max_retries):
+        failed = np.nonzero(np.isnan(flat))[0]
+        if failed.size == 0 or time.perf_counter() >= deadline:
+            break
+        quality.flat[failed] = QUALITY_RETRIED
+        flat[failed] = reread(failed, deadline)
+    quality[np.isnan(values)] = QUALITY_FAILED
+    return quality
+
+
+def diagonal_pairs(num_cells):
+    """The local-LED pairs LED(x,y) -> PD(x,y) for every cell, as (num_cells, 2)."""
+    return np.stack([np.arange(num_cells), np.arange(num_cells)], axis=1)
+
+
+def scan_pairs(session, pairs, led_settle=None, retry_budget=RETRY_BUDGET):
+    """
+    Read a subset of (led, pd) pairs as one frame: LED-grouped reads, per-cell retries
+    and dark subtraction like scan_full_matrix. Returns (values, quality), one per pair.
+    """
+    pairs = [tuple(pair) for pair in pairs]
+    values, _ = read_pairs(session, pairs, led_settle)
+
+    def reread(cells, deadline):
+        readings, _ = read_pairs(session, [pairs[cell] for cell in cells], led_settle, deadline)
+        return readings
+
+    quality = retry_failed_cells(values, reread, retry_budget)
+    session.command('LAF')
+    if session.dark is not None:
+        values = values - session.dark.levels[[pd for _, pd in pairs]]
+    return values, quality
+
+
+def scan_full_matrix(session, led_settle=None, retry_budget=RETRY_BUDGET):
+    """
+    LED-major scan of the full LED x PD matrix through an open SensorSession.
+
+    Each LED is switched once and waited on for its settle time (led_settle, or the
+    session's calibrated per-pair table); its PD sweep is then queued back-to-back on the
+    command pipeline, so the photodiodes are read at ADC speed (plus the session's PD
+    settle, if the hardware needs one). With session.binary_frames the whole sweep is one
+    GETROW and comes back as a single binary row frame; a row that times out or fails its
+    CRC is re-read over JSON. Cells whose reply was lost or garbled are re-read on their
+    own within retry_budget seconds; whatever is still missing stays NaN and is flagged
+    QUALITY_FAILED in frame.quality. If the session keeps a dark frame it is refreshed
+    before and subtracted after the scan.
+    """
+    if session.dark is not None:
+        session.dark.maybe_refresh()
+    num_cols = session.num_cols
+    num_cells = session.num_rows * num_cols
+    values = np.zeros((num_cells, num_cells), dtype=np.float32)
+    timestamps = np.zeros((num_cells, num_cells), dtype=np.float64)
+
+    wall_start = time.time()
+    perf_start = time.perf_counter()
+    for led in range(num_cells):
+        led_on = session.switch_led(led // num_cols + 1, led % num_cols + 1)
+        settles = [session.led_settle_for(led, pd) if led_settle is None else led_settle for pd in range(num_cells)]
+        if session.binary_frames:
+            reply = session.pipeline.send('GETROW', not_before=led_on + max(settles), timeout=row_timeout(num_cells))
+            if session.pipeline.decoder.decode(session.pipeline.wait(reply), values[led]) == led:
+                timestamps[led] = wall_start + (reply.received_at - perf_start)  # row arrives as one frame
+                continue
+            print(f"⚠️ Binary row for LED {led} lost, re-reading it as JSON")
+
+        pending = [session.queue_read(pd // num_cols + 1, pd % num_cols + 1, not_before=led_on + settles[pd])
+                   for pd in range(num_cells)]
+        for pd, reply in enumerate(pending):
+            values[led, pd] = parse_value(session.pipeline.wait(reply))
+            timestamps[led, pd] = wall_start + (reply.received_at - perf_start)
+
+    def reread(cells, deadline):
+        readings, received = read_pairs(session, [divmod(cell, num_cells) for cell in cells], led_settle, deadline)
+        reached = ~np.isnan(received)
+        timestamps.flat[cells[reached]] = [perf_to_wall(t) for t in received[reached]]
+        return readings
+
+    quality = retry_failed_cells(values, reread, retry_budget)
+    session.command('LAF')
+    if (quality == QUALITY_FAILED).any():
+        print(f"⚠️ {(quality == QUALITY_FAILED).sum()} cell(s) still invalid after retries (left as NaN)")
+    if session.dark is not None:
+        values = session.dark.subtract_full(values).astype(np.float32)
+
+    return FullFrame(values, timestamps, wall_start, time.perf_counter() - perf_start, quality)
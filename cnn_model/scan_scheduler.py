@@ -0,0 +1,121 @@
+import time
+
+import numpy as np
+
+from cnn_model.grid import NUM_COLS, NUM_ROWS
+from cnn_model.scan_engine import QUALITY_FAILED, QUALITY_OK, FullFrame, perf_to_wall, read_pairs
+
+# Configuration
+FRAME_BUDGET = 5.0       # Seconds one scheduled frame may take
+READ_TIME = 0.028        # One GETVAL on the JSON firmware (5 x analogRead + delay(5)) plus PD settle
+LED_SWITCH_TIME = 0.02   # LED settle paid once per LED that is lit in a frame
+NEIGHBOUR_RADIUS = 1     # PDs within this many cells of the LED count as near pairs
+NEAR_SHARE = 0.7         # Fraction of the frame budget reserved for near pairs
+
+#
+# Near pairs get NEAR_SHARE of each frame's budget; the rest reads a rotating window
+# of the far pairs.
+#
+
+
+class ScanScheduler:
+    """Chooses which (led, pd) pairs each frame reads so a frame fits in frame_budget seconds."""
+
+    def __init__(self, num_rows=NUM_ROWS, num_cols=NUM_COLS, frame_budget=FRAME_BUDGET,
+                 radius=NEIGHBOUR_RADIUS, near_share=NEAR_SHARE, read_time=READ_TIME,
+                 led_switch_time=LED_SWITCH_TIME):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.frame_budget = frame_budget
+        self.near_share = near_share
+        self.read_time = read_time
+        self.led_switch_time = led_switch_time
+
+        rows, cols = np.divmod(np.arange(num_rows * num_cols), num_cols)
+        distance = np.maximum(np.abs(rows[:, None] - rows[None, :]), np.abs(cols[:, None] - cols[None, :]))
+        self.near = np.argwhere(distance <= radius)   # (pairs, 2), LED-major
+        self.far = np.argwhere(distance > radius)
+        self.near_cursor = 0
+        self.far_cursor = 0
+
+    def estimate_time(self, pairs):
+        """Frame time for reading pairs LED-major: one settle per distinct LED plus one read per pair."""
+        if len(pairs) == 0:
+            return 0.0
+        return len(np.unique(pairs[:, 0])) * self.led_switch_time + len(pairs) * self.read_time
+
+    def _fill(self, pool, cursor, budget, lit):
+        """Take pairs from pool starting at cursor (wrapping) while they fit budget; returns (pairs, cursor, spent)."""
+        chosen = []
+        spent = 0.0
+        for _ in range(len(pool)):
+            led, pd = pool[cursor]
+            cost = self.read_time + (0.0 if led in lit else self.led_switch_time)
+            if spent + cost > budget:
+                break
+            spent += cost
+            lit.add(led)
+            chosen.append((led, pd))
+            cursor = (cursor + 1) % len(pool)
+        return chosen, cursor, spent
+
+    def _plan(self):
+        lit = set()
+        near, near_cursor, spent = self._fill(self.near, self.near_cursor, self.frame_budget * self.near_share, lit)
+        far, far_cursor, _ = self._fill(self.far, self.far_cursor, self.frame_budget - spent, lit)
+        return near, far, near_cursor, far_cursor
+
+    def next_pairs(self):
+        """(pairs, 2) array of (led, pd) cell indices for the next frame, sorted LED-major."""
+        near, far, self.near_cursor, self.far_cursor = self._plan()
+        pairs = np.array(near + far, dtype=int).reshape(-1, 2)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def refresh_frames(self):
+        """Frames until every near pair and every far pair has been read once: (near, far)."""
+        near, far, _, _ = self._plan()
+        frames = lambda pool, taken: int(np.ceil(len(pool) / len(taken))) if taken else float('inf')
+        return frames(self.near, near), (frames(self.far, far) if len(self.far) else 0)
+
+
+class ScheduledScan:
+    """
+    Full LED x PD matrix kept up to date one budgeted frame at a time. Pairs not read in
+    the current frame keep their last value and timestamp (NaN / 0 until first read).
+    """
+
+    def __init__(self, session, scheduler=None, frame_budget=FRAME_BUDGET):
+        self.session = session
+        self.scheduler = scheduler or ScanScheduler(session.num_rows, session.num_cols, frame_budget)
+        num_cells = session.num_rows * session.num_cols
+        self.values = np.full((num_cells, num_cells), np.nan, dtype=np.float32)
+        self.timestamps = np.zeros((num_cells, num_cells), dtype=np.float64)
+
+    def scan(self):
+        """Read the next scheduled set of pairs; returns a FullFrame snapshot of the whole matrix."""
+        pairs = self.scheduler.next_pairs()
+        wall_start = time.time()
+        perf_start = time.perf_counter()
+        readings, received = read_pairs(self.session, [tuple(pair) for pair in pairs])
+        self.session.command('LAF')
+
+        valid = ~np.isnan(readings)
+        leds, pds = pairs[valid, 0], pairs[valid, 1]
+        self.values[leds, pds] = readings[valid]
+        self.timestamps[leds, pds] = [perf_to_wall(t) for t in received[valid]]
+        quality = np.full(self.values.shape, QUALITY_OK, dtype=np.uint8)
+        quality[np.isnan(self.values)] = QUALITY_FAILED   # never read yet, or every read so far failed
+        self.session.last_quality = quality
+        return FullFrame(self.values.copy(), self.timestamps.copy(), wall_start, time.perf_counter() - perf_start,
+                         quality)
+
+
+# === Main: frame budget plan per grid size ===
+if __name__ == "__main__":
+    for side in (5, 10, 16):
+        scheduler = ScanScheduler(side, side)
+        full = scheduler.estimate_time(np.concatenate([scheduler.near, scheduler.far]))
+        near_frames, far_frames = scheduler.refresh_frames()
+        print(f"📐 {side}x{side}: full matrix {full / 60:.1f} min; with {scheduler.frame_budget:.0f} s frames "
+              f"the {len(scheduler.near)} near pairs refresh every {near_frames} frame(s), "
+              f"the {len(scheduler.far)} far pairs every {far_frames}")
@@ -0,0 +1,280 @@
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from cnn_model.command_pipeline import CommandPipeline, MAX_IN_FLIGHT, REPLY_TIMEOUT, parse_value
+from cnn_model.dark_frame import DarkFrameCache
+from cnn_model.grid import NUM_COLS, NUM_ROWS, cell_address
+from cnn_model.scan_engine import read_pairs, retry_failed_cells, scan_full_matrix
+from cnn_model.settle_calibration import load_settle_table
+from cnn_model.virtual_device import open_serial
+
+# Configuration
+COM_PORT = 'COM3'
+BAUD_RATE = 115200
+DELAY = 0.05          # Delay between serial commands (legacy_delays mode)
+LED_SETTLE = 0.02     # LED rise time waited after LOXxy before the first read (pipelined mode)
+PD_SETTLE = 0.001     # Photodiode mux settle waited after DONxy before GETVAL (pipelined mode)
+RESET_TIMEOUT = 4.0   # Give up waiting for the Arduino reset after this long
+PROBE_INTERVAL = 0.1  # How often the handshake pokes the board while it boots
+DRAIN_TIMEOUT = 0.25  # Longer than one legacy-firmware reply (delay(100) + ADC)
+
+
+class SensorSession:
+    """
+    Long-lived connection to the LED/photodiode board.
+
+    Opens the port once, waits for the Arduino auto-reset with a reply handshake instead
+    of a blind sleep(2), and keeps the port open for any number of scans.
+
+    By default commands go through a CommandPipeline: they are written back-to-back and
+    the only waits are the LED/PD settle times and the firmware's reply lines. Pass
+    legacy_delays=True to get the old fixed time.sleep(delay) between every command.
+    If a settle table from settle_calibration.py exists, its per-pair LED delays and
+    per-PD delays replace the flat led_settle / pd_settle values. binary_frames=True makes
+    scan_full() fetch each LED's PD sweep as one GETROW binary frame (JSON firmware only).
+    num_rows / num_cols set the grid; past 9x9 cells are addressed as LOXrrcc / DONrrcc.
+    dark_refresh=<seconds> captures an all-LEDs-off dark frame on open, refreshes it a few
+    photodiodes at a time every dark_refresh seconds, and subtracts it from every scan.
+
+
+        with SensorSession('COM3') as session:
+            for _ in range(10):
+                frame = session.scan_diagonal()
+    """
+
+    def __init__(self, port=COM_PORT, baud_rate=BAUD_RATE, timeout=1, delay=DELAY,
+                 firmware=None, num_rows=NUM_ROWS, num_cols=NUM_COLS, legacy_delays=False,
+                 led_settle=LED_SETTLE, pd_settle=PD_SETTLE, settle_table=None, max_in_flight=MAX_IN_FLIGHT,
+                 reply_timeout=REPLY_TIMEOUT, binary_frames=False, dark_refresh=None, **virtual_kwargs):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.delay = delay
+        self.legacy_delays = legacy_delays
+        self.led_settle = led_settle
+        self.pd_settle = pd_settle
+        self.settle_table = load_settle_table() if settle_table is None else settle_table
+        self.max_in_flight = max_in_flight
+        self.reply_timeout = reply_timeout
+        self.binary_frames = binary_frames
+        self.dark_refresh = dark_refresh
+        self.dark = None          # DarkFrameCache once opened with dark_refresh
+        self.firmware = firmware  # 'json', 'legacy' or None to detect during the handshake
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.virtual_kwargs = virtual_kwargs
+        self.ser = None
+        self.pipeline = None
+        self._last_read = None
+        self.last_quality = None  # per-cell QUALITY_* flags of the most recent scan
+
+    # === Connection ===
+    def open(self):
+        if self.ser is None:
+            self.ser = open_serial(self.port, self.baud_rate, timeout=self.timeout, num_rows=self.num_rows,
+                                   num_cols=self.num_cols, **self.virtual_kwargs)
+            self.handshake()
+            if self.dark_refresh is not None:
+                self.dark = DarkFrameCache(self, self.dark_refresh)
+                self.dark.capture()
+        return self
+
+    def handshake(self):
+        """Poke the board until it answers, i.e. the auto-reset finished; detect the firmware."""
+        self.ser.timeout = PROBE_INTERVAL
+        deadline = time.perf_counter() + RESET_TIMEOUT
+        line = ''
+        try:
+            while not line and time.perf_counter() < deadline:
+                self.ser.write(b'GETVAL\n')
+                line = self.ser.readline().decode(errors='ignore').strip()
+
+            # Drop replies to probes that were still in flight
+            self.ser.timeout = DRAIN_TIMEOUT
+            while self.ser.readline():
+                pass
+        finally:
+            self.ser.timeout = self.timeout
+
+        if self.firmware is None:
+            self.firmware = 'legacy' if line and not line.startswith('{') else 'json'
+        if self.binary_frames and self.firmware == 'legacy':
+            print("⚠️ Legacy firmware has no GETROW, falling back to JSON reads.")
+            self.binary_frames = False
+        self.pipeline = CommandPipeline(self.ser, self.firmware, self.max_in_flight, self.reply_timeout)
+        self.command('LAF')
+
+    def close(self):
+        if self.ser is not None:
+            self.ser.write(b'LAF\n')
+            self.ser.close()
+            self.ser = None
+            self.pipeline = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === Settle times ===
+    def led_settle_for(self, led, pd):
+        """Seconds to wait after LOX before reading pd (0-based cell indices)."""
+        if self.settle_table is None:
+            return self.led_settle
+        return float(self.settle_table.led_pd[led, pd])
+
+    def pd_settle_for(self, pd):
+        """Seconds to wait after DON before GETVAL on pd (0-based cell index)."""
+        if self.settle_table is None:
+            return self.pd_settle
+        return float(self.settle_table.pd[pd])
+
+    # === Commands ===
+    def address(self, row, col):
+        """Wire address of 1-based (row, col) for this grid, e.g. '23' or '0203'."""
+        return cell_address(row, col, self.num_rows, self.num_cols)
+
+    def command(self, cmd):
+        """Send one command; return the reply line if the firmware sends one, else None."""
+        pending = self.pipeline.send(cmd)
+        return None if pending is None else self.pipeline.wait(pending)
+
+    def queue_read(self, pd_row, pd_col, not_before=None):
+        """Queue a read of PD(row, col) (1-based) without waiting; returns its PendingReply."""
+        if self.firmware == 'legacy':
+            return self.pipeline.send(f'DON{self.address(pd_row, pd_col)}', not_before=not_before)
+
+        self.pipeline.send(f'DON{self.address(pd_row, pd_col)}')
+        selected_at = time.perf_counter()
+        pd_settle = self.pd_settle_for((pd_row - 1) * self.num_cols + pd_col - 1)
+        last = self._last_read
+        if pd_settle and last is not None:
+            # The firmware only executes DON once it finished the previous GETVAL
+            self.pipeline.wait(last)
+            selected_at = max(selected_at, last.received_at)
+        pd_ready = selected_at + pd_settle
+        not_before = pd_ready if not_before is None else max(not_before, pd_ready)
+        self._last_read = self.pipeline.send('GETVAL', not_before=not_before)
+        return self._last_read
+
+    def switch_led(self, led_row, led_col):
+        """Light only LED(row, col) once the board is idle; returns the time it was switched."""
+        self.pipeline.drain()
+        self.pipeline.send(f'LOX{self.address(led_row, led_col)}')
+        return time.perf_counter()
+
+    def read_photodiode(self, pd_row, pd_col):
+        """Select PD(row, col) (1-based) and read it with whatever LEDs are currently lit."""
+        if not self.legacy_delays:
+            return parse_value(self.pipeline.wait(self.queue_read(pd_row, pd_col)))
+        if self.firmware == 'legacy':
+            return parse_value(self.command(f'DON{self.address(pd_row, pd_col)}'))
+        self.command(f'DON{self.address(pd_row, pd_col)}')
+        time.sleep(self.delay)
+        return parse_value(self.command('GETVAL'))
+
+    # === Scans ===
+    def scan_diagonal(self):
+        """
+        For each cell, light LED(x,y) and read PD(x,y). Returns a (rows, cols) matrix;
+        failed cells are retried and otherwise NaN (see last_quality).
+        """
+        if self.dark is not None:
+            self.dark.maybe_refresh()
+        matrix = np.zeros((self.num_rows, self.num_cols))
+        for row in range(self.num_rows):
+            for col in range(self.num_cols):
+                if self.legacy_delays:
+                    self.command(f'LOX{self.address(row + 1, col + 1)}')
+                    time.sleep(self.delay)
+                    matrix[row, col] = self.read_photodiode(row + 1, col + 1)
+                    time.sleep(self.delay)
+                    self.command('LAF')
+                    time.sleep(self.delay)
+                else:
+                    led_on = self.switch_led(row + 1, col + 1)
+                    cell = row * self.num_cols + col
+                    pending = self.queue_read(row + 1, col + 1, not_before=led_on + self.led_settle_for(cell, cell))
+                    self.pipeline.send('LAF')
+                    matrix[row, col] = parse_value(self.pipeline.wait(pending))
+
+        def reread(cells, deadline):
+            values, _ = read_pairs(self, [(cell, cell) for cell in cells], deadline=deadline)
+            self.command('LAF')
+            return values
+
+        self.last_quality = retry_failed_cells(matrix, reread)
+        return matrix if self.dark is None else self.dark.subtract(matrix)
+
+    def scan_full(self):
+        """Light each LED in turn and read every PD. Returns a (LEDs, PDs) response matrix."""
+        if not self.legacy_delays:
+            frame = scan_full_matrix(self)
+            self.last_quality = frame.quality
+            return frame.values
+
+        if self.dark is not None:
+            self.dark.maybe_refresh()
+        num_cells = self.num_rows * self.num_cols
+        matrix = np.zeros((num_cells, num_cells))
+        for led in range(num_cells):
+            led_row, led_col = divmod(led, self.num_cols)
+            self.command(f'LOX{self.address(led_row + 1, led_col + 1)}')
+            time.sleep(self.delay)
+            for pd in range(num_cells):
+                pd_row, pd_col = divmod(pd, self.num_cols)
+                matrix[led, pd] = self.read_photodiode(pd_row + 1, pd_col + 1)
+                time.sleep(self.delay)
+
+        def reread(cells, deadline):
+            values, _ = read_pairs(self, [divmod(cell, num_cells) for cell in cells], deadline=deadline)
+            return values
+
+        self.last_quality = retry_failed_cells(matrix, reread)
+        self.command('LAF')
+        return matrix if self.dark is None else self.dark.subtract_full(matrix)
+
+    def scan_photodiodes(self):
+        """
+        Read every PD once with the current LED state. Returns a (rows, cols) matrix.
+        The dark frame is subtracted but not refreshed here (that would switch the LEDs off).
+        """
+        matrix = np.zeros((self.num_rows, self.num_cols))
+        if not self.legacy_delays:
+            pending = [self.queue_read(row + 1, col + 1)
+                       for row in range(self.num_rows) for col in range(self.num_cols)]
+            for cell, reply in enumerate(pending):
+                matrix.flat[cell] = parse_value(self.pipeline.wait(reply))
+        else:
+            for row in range(self.num_rows):
+                for col in range(self.num_cols):
+                    matrix[row, col] = self.read_photodiode(row + 1, col + 1)
+                    time.sleep(self.delay)
+
+        def reread(cells, deadline):
+            return [self.read_photodiode(cell // self.num_cols + 1, cell % self.num_cols + 1) for cell in cells]
+
+        self.last_quality = retry_failed_cells(matrix, reread)
+        return matrix if self.dark is None else self.dark.subtract(matrix)
+
+    def set_leds(self, mask):
+        """Turn off all LEDs, then send LOXxy for every cell where mask[row, col] == 1."""
+        self.command('LAF')
+        for row, col in zip(*np.nonzero(np.asarray(mask))):
+            self.command(f'LOX{self.address(row + 1, col + 1)}')
+            if self.legacy_delays:
+                time.sleep(self.delay)
+        self.pipeline.drain()
+
+
+@contextmanager
+def borrow_session(session=None, port=COM_PORT, **kwargs):
+    """Yield the caller's open session, or open a temporary one for a single call."""
+    if session is not None:
+        yield session
+    else:
+        with SensorSession(port, **kwargs) as temporary:
+            yield temporary
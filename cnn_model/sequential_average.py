@@ -0,0 +1,116 @@
+import time
+
+import numpy as np
+
+from cnn_model.command_pipeline import parse_value
+from cnn_model.scan_engine import MAX_RETRIES
+
+# Configuration
+CI_WIDTH = 2.0     # Stop re-reading a cell once its confidence interval is narrower than this (ADC counts)
+MIN_READS = 3      # Reads every cell gets before its variance is trusted
+MAX_READS = 10     # Hard cap per cell, noisy or not
+
+# Two-sided 95 % Student-t critical values for 1..30 degrees of freedom (reads - 1);
+# more degrees of freedom use the last entry, slightly above the normal 1.96
+T_95 = np.array([12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042])
+
+
+def t_critical(count):
+    """95 % t quantile per cell for count - 1 degrees of freedom (at least one)."""
+    return T_95[np.clip(np.asarray(count) - 1, 1, len(T_95)) - 1]
+
+
+class WelfordAverager:
+    """
+    Streaming per-cell mean / variance (Welford). Each update only touches the cells
+    that are still active, so cells can stop at different read counts.
+    """
+
+    def __init__(self, shape, ci_width=CI_WIDTH, min_reads=MIN_READS, max_reads=MAX_READS):
+        self.count = np.zeros(shape, dtype=np.int32)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.ci_width = ci_width
+        self.min_reads = min_reads
+        self.max_reads = max_reads
+
+    def update(self, values, mask=None):
+        """Add one reading for every cell where mask is True (all cells if mask is None)."""
+        mask = np.ones(self.count.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        values = np.asarray(values, dtype=np.float64)
+        self.count[mask] += 1
+        delta = values[mask] - self.mean[mask]
+        self.mean[mask] += delta / self.count[mask]
+        self.m2[mask] += delta * (values[mask] - self.mean[mask])
+
+    @property
+    def variance(self):
+        """Sample variance per cell (0 where fewer than two reads)."""
+        return np.divide(self.m2, self.count - 1, out=np.zeros_like(self.m2), where=self.count > 1)
+
+    @property
+    def ci_half_width(self):
+        """Half width of the 95 % t confidence interval of each cell's mean (inf below two reads)."""
+        half_width = t_critical(self.count) * np.sqrt(self.variance / np.maximum(self.count, 1))
+        return np.where(self.count > 1, half_width, np.inf)
+
+    @property
+    def active(self):
+        """Cells that still need another read."""
+        confident = (self.count >= self.min_reads) & (2 * self.ci_half_width <= self.ci_width)
+        return ~confident & (self.count < self.max_reads)
+
+
+def average_until_confident(read, shape, **averager_kwargs):
+    """
+    Call read(active_mask) -> array of `shape` (only active cells need valid values)
+    until every cell is confident or hit max_reads. NaN readings (failed reads) are not
+    counted and get up to MAX_RETRIES extra rounds. Returns (mean, variance, count);
+    cells that never got a valid read have a NaN mean.
+    """
+    averager = WelfordAverager(shape, **averager_kwargs)
+    active = averager.active
+    for _ in range(averager.max_reads + MAX_RETRIES):
+        if not active.any():
+            break
+        values = read(active)
+        averager.update(values, active & ~np.isnan(values))
+        active = averager.active
+    mean = np.where(averager.count > 0, averager.mean, np.nan)
+    return mean, averager.variance, averager.count
+
+
+def scan_full_until_confident(session, **averager_kwargs):
+    """
+    Full LED x PD scan that re-reads only the pairs that are still noisy. LEDs whose
+    PDs are all confident are skipped entirely on later rounds. The mean is
+    dark-subtracted if the session keeps a dark frame.
+    Returns (mean, variance, count), each (LEDs, PDs).
+    """
+    num_cols = session.num_cols
+    num_cells = session.num_rows * num_cols
+
+    def read(active):
+        values = np.zeros((num_cells, num_cells))
+        for led in np.nonzero(active.any(axis=1))[0]:
+            led_on = session.switch_led(led // num_cols + 1, led % num_cols + 1)
+            pending = [(pd, session.queue_read(pd // num_cols + 1, pd % num_cols + 1,
+                                               not_before=led_on + session.led_settle_for(led, pd)))
+                       for pd in np.nonzero(active[led])[0]]
+            for pd, reply in pending:
+                values[led, pd] = parse_value(session.pipeline.wait(reply))
+        session.command('LAF')
+        return values
+
+    if session.dark is not None:
+        session.dark.maybe_refresh()
+    start = time.perf_counter()
+    mean, variance, count = average_until_confident(read, (num_cells, num_cells), **averager_kwargs)
+    if session.dark is not None:
+        mean = session.dark.subtract_full(mean)
+    max_reads = averager_kwargs.get('max_reads', MAX_READS)
+    print(f"📈 {count.sum()} reads in {time.perf_counter() - start:.1f} s "
+          f"(a fixed {max_reads}x average needs {count.size * max_reads})")
+    return mean, variance, count
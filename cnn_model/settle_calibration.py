@@ -0,0 +1,171 @@
+import os
+import time
+
+import numpy as np
+
+from cnn_model.command_pipeline import parse_value
+
+# Configuration
+COM_PORT = 'COM3'
+SETTLE_TABLE_PATH = 'settle_table.npz'
+DELAYS = (0.0, 0.002, 0.005, 0.01, 0.02, 0.04, 0.08, 0.15, 0.3, 0.5)  # Probe delays after LOX/DON; the
+                                                                       # last is steady state (> 7 tau)
+TOLERANCE = 0.01     # Fraction of the step height that counts as settled
+NOISE_FLOOR = 2.0    # ADC counts; steps smaller than this never need more than the noise
+OFF_TIME = 0.02      # LEDs-off time between two probes of the same pair
+STEADY_READS = 3     # Readings averaged at the longest delay to estimate steady state
+
+
+class SettleTable:
+    """Minimal delays (seconds) after LOX per LED/PD pair and after DON per photodiode."""
+
+    def __init__(self, led_pd, pd, tolerance=TOLERANCE):
+        self.led_pd = np.asarray(led_pd, dtype=np.float32)   # (LEDs, PDs)
+        self.pd = np.asarray(pd, dtype=np.float32)           # (PDs,)
+        self.tolerance = tolerance
+
+    def save(self, path=SETTLE_TABLE_PATH):
+        np.savez(path, led_pd=self.led_pd, pd=self.pd, tolerance=self.tolerance)
+
+    @classmethod
+    def load(cls, path=SETTLE_TABLE_PATH):
+        data = np.load(path)
+        return cls(data['led_pd'], data['pd'], float(data['tolerance']))
+
+
+def settled_delay(delays, readings, baseline, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR):
+    """
+    Time after the switch until the reading stays within tolerance of steady state.
+    readings[-1] is taken as steady state, baseline as the value before the step.
+
+    A probe reads `offset + delay` after the real switch, where the offset (wire time,
+    firmware latency, 25 ms GETVAL window) is the same for every probe. For a first-order
+    step the residual steady - reading is step * C * exp(-delay / tau): the offset and
+    the window average only scale C. So tau comes from the slope of log(residual) over
+    the delays, and the settle time is tau * ln(1 / tolerance) from the switch.
+    """
+    delays = np.asarray(delays, dtype=np.float64)
+    readings = np.asarray(readings, dtype=np.float64)
+    steady = readings[-1]
+    step = steady - baseline
+    if abs(step) <= noise_floor:
+        return 0.0
+    residual = (steady - readings[:-1]) / step
+    usable = (residual * abs(step) > noise_floor) & (residual < 1.0)
+    if usable.sum() >= 2:
+        slope = np.polyfit(delays[:-1][usable], np.log(residual[usable]), 1, w=residual[usable])[0]
+        if slope < 0:
+            return float(np.log(1.0 / tolerance) / -slope)
+    # Too few points above the noise to fit: first probe delay after which every reading is settled
+    band = max(tolerance * abs(step), noise_floor)
+    outside = np.nonzero(np.abs(readings - steady) > band)[0]
+    return float(delays[0] if len(outside) == 0 else delays[min(outside[-1] + 1, len(delays) - 1)])
+
+
+def _probe(session, delay, led=None, pd=None, other_pd=None):
+    """
+    One GETVAL `delay` seconds after switching the LED (led given) or the PD (other_pd given).
+    Returns (actual delay, value): short sleeps overshoot, so the send time is measured.
+    """
+    if led is not None:
+        session.command('LAF')
+        session.command(f'DON{session.address(*pd)}')
+        time.sleep(OFF_TIME)
+        switched = session.switch_led(*led)
+    else:
+        session.command(f'DON{session.address(*other_pd)}')
+        time.sleep(OFF_TIME)
+        session.pipeline.drain()
+        session.pipeline.send(f'DON{session.address(*pd)}')
+        switched = time.perf_counter()
+    pending = session.pipeline.send('GETVAL', not_before=switched + delay)
+    return pending.sent_at - switched, parse_value(session.pipeline.wait(pending))
+
+
+def _step_response(session, delays, **probe):
+    """(actual delays, readings) with the last delay averaged over STEADY_READS probes."""
+    measured = [_probe(session, d, **probe) for d in delays[:-1]]
+    steady = np.mean([_probe(session, delays[-1], **probe)[1] for _ in range(STEADY_READS)])
+    return [m[0] for m in measured] + [delays[-1]], [m[1] for m in measured] + [steady]
+
+
+def calibrate_settle_times(session, leds=None, pds=None, delays=DELAYS, tolerance=TOLERANCE,
+                           noise_floor=NOISE_FLOOR):
+    """
+    Measure the step response of each LED/PD pair by equivalent-time sampling: the pair is
+    switched on repeatedly and read once per probe delay. Uncalibrated pairs/PDs get the
+    worst calibrated value. Needs the JSON (GETVAL) firmware.
+    """
+    if session.firmware != 'json':
+        raise ValueError("Settle calibration needs the GETVAL firmware (SerialControlLEDs-New).")
+
+    num_cols = session.num_cols
+    num_cells = session.num_rows * num_cols
+    leds = range(num_cells) if leds is None else leds
+    pds = range(num_cells) if pds is None else pds
+    address = lambda index: (index // num_cols + 1, index % num_cols + 1)
+
+    led_pd = np.full((num_cells, num_cells), np.nan)
+    for led in leds:
+        for pd in pds:
+            session.command('LAF')
+            session.command(f'DON{session.address(*address(pd))}')
+            time.sleep(max(delays))
+            baseline = parse_value(session.command('GETVAL'))
+
+            actual, readings = _step_response(session, delays, led=address(led), pd=address(pd))
+            led_pd[led, pd] = settled_delay(actual, readings, baseline, tolerance, noise_floor)
+        print(f"💡 LED {address(led)}: settle {np.nanmax(led_pd[led]) * 1000:.1f} ms (worst PD)")
+
+    pd_table = np.full(num_cells, np.nan)
+    for pd in pds:
+        other = address((pd + 1) % num_cells)
+        session.switch_led(*address(pd))
+        time.sleep(max(delays))
+        baseline = _probe(session, max(delays), pd=other, other_pd=address(pd))[1]  # level before the switch
+        actual, readings = _step_response(session, delays, pd=address(pd), other_pd=other)
+        pd_table[pd] = settled_delay(actual, readings, baseline, tolerance, noise_floor)
+    session.command('LAF')
+
+    led_pd[np.isnan(led_pd)] = np.nanmax(led_pd)
+    pd_table[np.isnan(pd_table)] = np.nanmax(pd_table)
+    return SettleTable(led_pd, pd_table, tolerance)
+
+
+def load_settle_table(path=SETTLE_TABLE_PATH):
+    """Return the saved SettleTable, or None if the rig has not been calibrated yet."""
+    return SettleTable.load(path) if os.path.exists(path) else None
+
+
+def check_virtual(led_settle=(0.002, 0.03), pd=0, rel_tolerance=0.25):
+    """
+    Calibrate a virtual board whose LEDs rise with the given time constants and check the
+    table against their true settle times (tau * ln(1 / TOLERANCE)); returns the table.
+    """
+    from cnn_model.sensor_session import SensorSession
+
+    with SensorSession('VIRTUAL', boot_time=0.2) as session:
+        session.ser.led_settle[:len(led_settle)] = led_settle
+        table = calibrate_settle_times(session, leds=range(len(led_settle)), pds=[pd])
+    expected = np.asarray(led_settle) * np.log(1.0 / TOLERANCE)
+    measured = table.led_pd[:len(led_settle), pd]
+    for tau, want, got in zip(led_settle, expected, measured):
+        print(f"🔬 tau {tau * 1000:.0f} ms: settle {got * 1000:.1f} ms, expected {want * 1000:.1f} ms")
+    if np.any(np.abs(measured - expected) > rel_tolerance * expected):
+        raise ValueError(f"Calibration off: measured {measured}, expected {expected}")
+    return table
+
+
+# === Main ===
+if __name__ == "__main__":
+    from cnn_model.sensor_session import SensorSession
+
+    if COM_PORT.startswith('VIRTUAL'):
+        check_virtual()
+    with SensorSession(COM_PORT) as session:
+        table = calibrate_settle_times(session)
+    table.save(SETTLE_TABLE_PATH)
+    print(f"✅ Saved settle table to {SETTLE_TABLE_PATH}")
+    print(f"📊 LED settle per pair: median {np.median(table.led_pd) * 1000:.1f} ms, "
+          f"max {table.led_pd.max() * 1000:.1f} ms")
+    print(f"📊 PD settle: max {table.pd.max() * 1000:.1f} ms")
@@ -1,55 +1,28 @@
-import serial
-import json
-import time
-import numpy as np
 import matplotlib.pyplot as plt
 
+from cnn_model.scan_engine import ScanRateTracker, scan_full_matrix
+from cnn_model.sensor_session import SensorSession
+
 # Config
-COM_PORT = 'COM3'  # Set to your port
+COM_PORT = 'COM3'  # Set to your port ('VIRTUAL' runs against the simulated board)
 BAUD_RATE = 115200
 NUM_ROWS = 5
 NUM_COLS = 5
-DELAY = 0.05  # Delay between serial commands
-
-# Open serial
-ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=1)
-time.sleep(2)
-
-matrix = np.zeros((NUM_ROWS * NUM_COLS, NUM_ROWS * NUM_COLS))  # 25 LEDs x 25 PDs
-
-# Loop over each LED
-for led_row in range(1, NUM_ROWS + 1):
-    for led_col in range(1, NUM_COLS + 1):
-        led_index = (led_row - 1) * NUM_COLS + (led_col - 1)
-
-        # Activate LED
-        ser.write(f'LOX{led_row}{led_col}\n'.encode())
-        time.sleep(DELAY)
-
-        # Read all PDs for this LED
-        for pd_row in range(1, NUM_ROWS + 1):
-            for pd_col in range(1, NUM_COLS + 1):
-                pd_index = (pd_row - 1) * NUM_COLS + (pd_col - 1)
-
-                ser.write(f'DON{pd_row}{pd_col}\n'.encode())
-                time.sleep(DELAY)
-
-                ser.write(b'GETVAL\n')
-                line = ser.readline().decode().strip()
-
-                try:
-                    data = json.loads(line)
-                    val = float(data['val'])
-                except:
-                    val = 0.0  # fallback
-                    print("⚠️ Failed to parse:", line)
-
-                matrix[led_index, pd_index] = val
-                time.sleep(DELAY)
-
-# All LEDs OFF
-ser.write(b'LAF\n')
-ser.close()
+BINARY_FRAMES = False  # One GETROW binary frame per LED instead of 25 JSON replies (needs the New firmware)
+NUM_SCANS = 1  # Repeated full scans; the rolling rate is reported after each
+
+# Collect the 25 LEDs x 25 PDs response matrix (LED-major, settles once per LED)
+rate = ScanRateTracker()
+with SensorSession(COM_PORT, BAUD_RATE, num_rows=NUM_ROWS, num_cols=NUM_COLS, binary_frames=BINARY_FRAMES) as session:
+    for scan in range(NUM_SCANS):
+        frame = scan_full_matrix(session)
+        rate.record(frame)
+        print(f"⏱️ Scan {scan + 1}/{NUM_SCANS} took {frame.duration:.2f} s "
+              f"(rolling {rate.frames_per_minute:.2f} frames/min over {len(rate.durations)} scans)")
+    if session.binary_frames:
+        print(f"📦 Binary frames: {session.pipeline.decoder.report()}")
+
+matrix = frame.values
 
 # ✅ Plot heatmap
 plt.figure(figsize=(10, 8))
@@ -0,0 +1,349 @@
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from cnn_model.binary_frames import encode_row_frame
+from cnn_model.grid import split_address
+
+# Configuration
+VIRTUAL_PORT = 'VIRTUAL'  # Use 'VIRTUAL' (JSON firmware) or 'VIRTUAL:legacy' as COM_PORT
+BAUD_RATE = 115200
+NUM_ROWS = 5
+NUM_COLS = 5
+RESPONSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'cnn_dense_model', 'led_dataset_13x15.npz')
+
+# Timing model defaults (seconds)
+FIRMWARE_LATENCY = 0.0005  # readStringUntil + shiftOutState per command
+ADC_TIME = 0.025           # GETVAL: 5x analogRead() with delay(5)
+ADC_READS = 5
+ROW_PD_SETTLE = 0.001      # GETROW: delayMicroseconds(1000) after each photodiode switch
+LEGACY_DELAY = 0.1         # old firmware: delay(100) before every reply
+LED_SETTLE = 0.004         # LED rise time constant
+PD_SETTLE = 0.0002         # photodiode mux / ADC input time constant
+BOOT_TIME = 2.0            # Arduino auto-reset on port open
+NOISE_STD = 0.5
+RX_BUFFER_SIZE = 64        # Arduino hardware serial receive buffer
+
+
+def synthetic_response(num_rows=NUM_ROWS, num_cols=NUM_COLS, peak=900.0, width=1.0, floor=20.0):
+    """LED-to-PD response for grids without a recording: Gaussian falloff with LED/PD distance."""
+    rows, cols = np.divmod(np.arange(num_rows * num_cols), num_cols)
+    distance2 = (rows[:, None] - rows[None, :]) ** 2 + (cols[:, None] - cols[None, :]) ** 2
+    return floor + (peak - floor) * np.exp(-distance2 / (2 * width ** 2))
+
+
+def load_response_matrix(path=RESPONSE_PATH, index=0):
+    """Load a recorded 25x25 LED-to-PD response matrix from .npz, .npy or an LED_Matrix_*.xlsx workbook."""
+    if path.endswith('.npz'):
+        return np.asarray(np.load(path)['X'][index], dtype=np.float64)
+    if path.endswith('.npy'):
+        return np.asarray(np.load(path), dtype=np.float64)
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    rows = wb['Average'].iter_rows(min_row=2, max_row=26, min_col=2, max_col=26, values_only=True)
+    matrix = np.array([list(row) for row in rows], dtype=np.float64)
+    wb.close()
+    return matrix
+
+
+class VirtualLedMatrix:
+    """
+    Serial-port stand-in for the Arduino LED/photodiode board.
+
+    Speaks the SerialControlLEDs protocol (LOXxy, LOFxy, LONxy, LAF, DONxy, GETVAL, GETROW) and
+    answers from a recorded response matrix (rows = LED index, cols = PD index). Replies
+    are only readable once the modelled baud rate, firmware latency, ADC time and
+    LED/PD settle curves say the real board would have sent them.
+
+    firmware='json'   -> SerialControlLEDs-New: silent commands, GETVAL -> {"LED","PD","val"},
+                         GETROW -> one binary row frame (see binary_frames.py)
+    firmware='legacy' -> SerialControlLEDs: every command replies 'LOXx,DONx,val' after 100 ms
+    """
+
+    def __init__(self, response=None, port=VIRTUAL_PORT, baudrate=BAUD_RATE, timeout=1,
+                 firmware='json', latency=FIRMWARE_LATENCY, adc_time=ADC_TIME,
+                 legacy_delay=LEGACY_DELAY, led_settle=LED_SETTLE, pd_settle=PD_SETTLE,
+                 ambient=0.0, noise_std=NOISE_STD, boot_time=BOOT_TIME, seed=None,
+                 num_rows=NUM_ROWS, num_cols=NUM_COLS):
+        if response is None:
+            recorded = (num_rows, num_cols) == (NUM_ROWS, NUM_COLS)
+            response = load_response_matrix() if recorded else synthetic_response(num_rows, num_cols)
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        num_cells = num_rows * num_cols
+
+        self.response = np.asarray(response, dtype=np.float64).reshape(num_cells, num_cells)
+        self.ambient = np.broadcast_to(np.asarray(ambient, dtype=np.float64), (num_cells,)).copy()
+        self.led_settle = np.broadcast_to(np.asarray(led_settle, dtype=np.float64), (num_cells,)).copy()
+        self.pd_settle = np.broadcast_to(np.asarray(pd_settle, dtype=np.float64), (num_cells,)).copy()
+
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.firmware = firmware
+        self.latency = latency
+        self.adc_time = adc_time
+        self.legacy_delay = legacy_delay
+        self.noise_std = noise_std
+        self.rng = np.random.default_rng(seed)
+        self.is_open = True
+
+        # Firmware state
+        self.lit_leds = {}      # led index -> time it was switched on
+        self.selected_led = (-1, -1)
+        self.selected_pd = (-1, -1)
+        self.pd_on_time = None
+        self.lox_buff = ''
+        self.don_buff = ''
+        self.row_seq = 0
+
+        # Link / timing state
+        now = time.perf_counter()
+        self.ready_at = now + boot_time
+        self._busy_until = self.ready_at
+        self._rx_free_at = now
+        self._tx_free_at = now
+        self._pending_rx = deque()   # (start_time, nbytes) of commands still in the RX buffer
+        self._partial = b''
+        self._out = deque()          # (ready_time, bytes) queued replies
+        self._rx_ready = bytearray()
+
+        # Counters for benchmarks
+        self.commands = 0
+        self.dropped = 0
+        self.overruns = 0
+        self.bytes_out = 0
+
+    # === Timing helpers ===
+    @property
+    def char_time(self):
+        """Seconds on the wire per byte (8N1 = 10 bits)."""
+        return 10.0 / self.baudrate
+
+    def _collect_ready(self, now):
+        while self._out and self._out[0][0] <= now:
+            self._rx_ready.extend(self._out.popleft()[1])
+
+    # === Signal model ===
+    def _led_index(self, row, col):
+        return (row - 1) * self.num_cols + (col - 1)
+
+    def _valid(self, row, col):
+        return 1 <= row <= self.num_rows and 1 <= col <= self.num_cols
+
+    def _sample(self, t):
+        """Photodiode voltage at time t for the current LED/PD selection."""
+        if self.selected_pd[0] < 0:
+            return 0.0
+        pd = self._led_index(*self.selected_pd)
+        level = self.ambient[pd]
+        for led, t_on in self.lit_leds.items():
+            rise = 1.0 - np.exp(-max(t - t_on, 0.0) / self.led_settle[led])
+            level += self.response[led, pd] * rise
+        charge = 1.0 - np.exp(-max(t - self.pd_on_time, 0.0) / self.pd_settle[pd])
+        return level * charge
+
+    def _read_adc(self, t, reads=ADC_READS, spacing=None):
+        spacing = self.adc_time / reads if spacing is None else spacing
+        vals = [self._sample(t + i * spacing) for i in range(reads)]
+        val = float(np.mean(vals)) + self.rng.normal(0.0, self.noise_std)
+        return float(np.clip(val, 0.0, 1023.0))
+
+    # === Command execution ===
+    def _parse_address(self, command):
+        """'LOX23' -> (2, 3); 'LOX1016' -> (10, 16) for grids past 9x9."""
+        if len(command) not in (5, 7):
+            return -1, -1
+        try:
+            return split_address(command[3:])
+        except ValueError:
+            return -1, -1
+
+    def _execute(self, command, t):
+        """Apply one command at firmware time t, return (duration, reply bytes or None)."""
+        duration = self.latency
+        reply = None
+        name = command[:3]
+
+        if name == 'LOX':
+            row, col = self._parse_address(command)
+            self.lox_buff = command[:4]
+            if self._valid(row, col):
+                led = self._led_index(row, col)
+                self.lit_leds = {led: self.lit_leds.get(led, t)}
+                self.selected_led = (row, col)
+        elif name == 'DON':
+            row, col = self._parse_address(command)
+            self.don_buff = command[:4]
+            if self._valid(row, col) and (row, col) != self.selected_pd:
+                self.selected_pd = (row, col)
+                self.pd_on_time = t
+        elif name in ('LON', 'LOF'):
+            row, col = self._parse_address(command)
+            if self._valid(row, col):
+                led = self._led_index(row, col)
+                if name == 'LON':
+                    self.lit_leds.setdefault(led, t)
+                else:
+                    self.lit_leds.pop(led, None)
+        elif command == 'LAF':
+            self.lit_leds = {}
+
+        if self.firmware == 'legacy':
+            duration += self.legacy_delay
+            val = self._read_adc(t + duration, spacing=0.0001)
+            reply = f'{self.lox_buff},{self.don_buff},{val:.3f}\r\n'
+        elif command == 'GETVAL':
+            val = self._read_adc(t)
+            duration += self.adc_time
+            reply = json.dumps({'LED': f'{self.selected_led[0]},{self.selected_led[1]}',
+                                'PD': f'{self.selected_pd[0]},{self.selected_pd[1]}',
+                                'val': round(val, 2)}, separators=(',', ':')) + '\r\n'
+
+        elif command == 'GETROW':
+            frame, row_time = self._read_row(t + duration)
+            return duration + row_time, frame
+
+        return duration, None if reply is None else reply.encode()
+
+    def _read_row(self, t):
+        """GETROW: sweep every PD under the current LED; return (frame bytes, firmware time)."""
+        start = t
+        sums = []
+        for pd in range(self.num_rows * self.num_cols):
+            address = (pd // self.num_cols + 1, pd % self.num_cols + 1)
+            if address != self.selected_pd:
+                self.selected_pd = address
+                self.pd_on_time = t
+            t += ROW_PD_SETTLE
+            sums.append(round(self._read_adc(t) * ADC_READS))
+            t += self.adc_time
+        led = self._led_index(*self.selected_led) if self.selected_led[0] > 0 else 0xFFFF
+        frame = encode_row_frame(self.row_seq, led, sums, ADC_READS)
+        self.row_seq += 1
+        return frame, t - start
+
+    def _receive_line(self, line, t_arrive):
+        """Queue a complete command line that finished arriving at t_arrive."""
+        while self._pending_rx and self._pending_rx[0][0] <= t_arrive:
+            self._pending_rx.popleft()
+        if sum(n for _, n in self._pending_rx) + len(line) + 1 > RX_BUFFER_SIZE:
+            self.overruns += 1
+            return
+
+        start = max(t_arrive, self._busy_until)
+        if start < self.ready_at:
+            self.dropped += 1  # bootloader swallows bytes while the board resets
+            return
+
+        self.commands += 1
+        self._pending_rx.append((start, len(line) + 1))
+        duration, reply = self._execute(line.decode(errors='ignore').strip(), start)
+        self._busy_until = start + duration
+        if reply is not None:
+            tx_start = max(self._busy_until, self._tx_free_at)
+            self._tx_free_at = tx_start + len(reply) * self.char_time
+            self._out.append((self._tx_free_at, reply))
+            self.bytes_out += len(reply)
+
+    # === pyserial-compatible API ===
+    def write(self, data):
+        now = time.perf_counter()
+        t = max(now, self._rx_free_at)
+        buffer = self._partial + bytes(data)
+        *lines, self._partial = buffer.split(b'\n')
+        consumed = len(data) - len(self._partial)
+        for line in lines:
+            t += (len(line) + 1) * self.char_time
+            self._receive_line(line, t)
+        self._rx_free_at = max(self._rx_free_at, now) + consumed * self.char_time
+        return len(data)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while True:
+            now = time.perf_counter()
+            self._collect_ready(now)
+            if len(self._rx_ready) >= size or not self._out:
+                break
+            wake = self._out[0][0]
+            if deadline is not None and wake > deadline:
+                time.sleep(max(deadline - now, 0.0))
+                self._collect_ready(time.perf_counter())
+                break
+            time.sleep(max(wake - now, 0.0))
+        data = bytes(self._rx_ready[:size])
+        del self._rx_ready[:size]
+        return data
+
+    def readline(self):
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while True:
+            now = time.perf_counter()
+            self._collect_ready(now)
+            end = self._rx_ready.find(b'\n')
+            if end >= 0:
+                break
+            if not self._out or (deadline is not None and self._out[0][0] > deadline):
+                if deadline is not None:
+                    time.sleep(max(deadline - now, 0.0))
+                end = len(self._rx_ready) - 1
+                break
+            time.sleep(max(self._out[0][0] - now, 0.0))
+        line = bytes(self._rx_ready[:end + 1])
+        del self._rx_ready[:end + 1]
+        return line
+
+    @property
+    def in_waiting(self):
+        self._collect_ready(time.perf_counter())
+        return len(self._rx_ready)
+
+    def reset_input_buffer(self):
+        self._collect_ready(time.perf_counter())
+        self._rx_ready.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def flush(self):
+        time.sleep(max(self._rx_free_at - time.perf_counter(), 0.0))
+
+    def close(self):
+        self.is_open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_serial(port, baud_rate=BAUD_RATE, timeout=1, **virtual_kwargs):
+    """Open the real board via pyserial, or a VirtualLedMatrix when port is 'VIRTUAL[:legacy]'."""
+    if str(port).upper().startswith(VIRTUAL_PORT):
+        _, _, firmware = str(port).partition(':')
+        return VirtualLedMatrix(port=port, baudrate=baud_rate, timeout=timeout,
+                                firmware=firmware.lower() or 'json', **virtual_kwargs)
+
+    import serial  # only needed for real hardware
+    return serial.Serial(port, baud_rate, timeout=timeout)
+
+
+# === Main: time the existing acquisition routines without the bench rig ===
+if __name__ == "__main__":
+    from cnn_model.method_two_data import collect_sensor_matrix
+    from cnn_model.all_led_data import read_photodiodes_with_local_led
+
+    start = time.perf_counter()
+    collect_sensor_matrix(port=VIRTUAL_PORT)
+    print(f"⏱️ collect_sensor_matrix (JSON firmware): {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    read_photodiodes_with_local_led(port=f'{VIRTUAL_PORT}:legacy')
+    print(f"⏱️ read_photodiodes_with_local_led (legacy firmware): {time.perf_counter() - start:.2f} s")
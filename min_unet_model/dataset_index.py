@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+from PIL import Image
+
+from pack_dataset import IMAGE_DIR, MASK_DIR, save_json
+
+# --- CONFIG ---
+HERE = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(HERE, 'dataset_index.json')
+THUMB_SIZE = 48            # Thumbnails compared for near duplicates (box-filtered grayscale)
+NEAR_DUPLICATE_RMS = 2.0   # Gray levels (0-255): thumbnails closer than this count as near duplicates
+BLOCK = 1024               # Rows per block of the pairwise distance matrix
+INDEX_VERSION = 1
+
+# Data_Image_Mask.m writes one PNG per sheet of a workbook: <workbook>_<sheet>.png
+_SAMPLE_NAME = re.compile(r'(?P<workbook>.+)_(?P<sheet>[^_]+)\.png$')
+
+# Placement = identical mask pixels; near duplicates come from blockwise thumbnail distances.
+
+
+def _pixels(path):
+    return np.asarray(Image.open(path).convert('L'), dtype=np.uint8)
+
+
+def _digest(array):
+    return hashlib.sha1(array.tobytes()).hexdigest()
+
+
+def near_duplicate_pairs(thumbs, max_rms=NEAR_DUPLICATE_RMS, block=BLOCK):
+    """(pairs, 2) index pairs i < j whose thumbnails differ by less than max_rms gray levels RMS."""
+    flat = thumbs.reshape(len(thumbs), -1).astype(np.float32)
+    norms = (flat ** 2).sum(axis=1)
+    limit = max_rms ** 2 * flat.shape[1]
+    pairs = []
+    for start in range(0, len(flat), block):
+        stop = min(start + block, len(flat))
+        distance = norms[start:stop, None] + norms[None, :] - 2.0 * flat[start:stop] @ flat.T
+        i, j = np.nonzero(distance < limit)
+        i += start
+        keep = i < j
+        pairs.append(np.stack([i[keep], j[keep]], axis=1))
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=int)
+
+
+def _clusters(count, pairs):
+    """Union-find over the near-duplicate pairs: representative (lowest index) per sample."""
+    parent = np.arange(count)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        a, b = find(i), find(j)
+        parent[max(a, b)] = min(a, b)
+    return np.array([find(i) for i in range(count)])
+
+
+def build_index(image_dir=IMAGE_DIR, mask_dir=MASK_DIR, path=INDEX_PATH, max_rms=NEAR_DUPLICATE_RMS):
+    """Hash, group and duplicate-check every image/mask pair; writes and returns the index dict."""
+    files = sorted(set(os.listdir(image_dir)) & set(os.listdir(mask_dir)))
+    thumbs = np.zeros((len(files), THUMB_SIZE, THUMB_SIZE), dtype=np.uint8)
+    samples = []
+    placements = {}
+    for i, name in enumerate(files):
+        image = _pixels(os.path.join(image_dir, name))
+        mask = _pixels(os.path.join(mask_dir, name))
+        thumbs[i] = np.asarray(Image.fromarray(image).resize((THUMB_SIZE, THUMB_SIZE), Image.BOX))
+        match = _SAMPLE_NAME.match(name)
+        mask_hash = _digest(mask)
+        samples.append({
+            'file': name,
+            'workbook': match.group('workbook') if match else os.path.splitext(name)[0],
+            'sheet': match.group('sheet') if match else '',
+            'image_hash': _digest(image),
+            'mask_hash': mask_hash,
+            'placement': placements.setdefault(mask_hash, len(placements)),
+        })
+
+    first_seen = {}
+    for i, sample in enumerate(samples):
+        sample['duplicate_of'] = first_seen.setdefault(sample['image_hash'], i)
+    representative = _clusters(len(files), near_duplicate_pairs(thumbs, max_rms))
+    for sample, rep in zip(samples, representative):
+        sample['near_duplicate_of'] = int(rep)
+
+    index = {'version': INDEX_VERSION, 'image_dir': image_dir, 'mask_dir': mask_dir,
+             'near_duplicate_rms': max_rms, 'samples': samples}
+    save_json(path, index)
+    return index
+
+
+def load_index(image_dir=IMAGE_DIR, mask_dir=MASK_DIR, path=INDEX_PATH):
+    """The saved index, rebuilt when it is missing or the folders' file lists changed."""
+    files = sorted(set(os.listdir(image_dir)) & set(os.listdir(mask_dir)))
+    if os.path.exists(path):
+        with open(path) as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION and [s['file'] for s in index['samples']] == files:
+            return index
+    print("🔎 Indexing image/mask pairs...")
+    return build_index(image_dir, mask_dir, path)
+
+
+def deduplicated(index):
+    """Sample positions keeping one representative per near-duplicate cluster."""
+    return [i for i, sample in enumerate(index['samples']) if sample['near_duplicate_of'] == i]
+
+
+def grouped_split(index, test_size=0.2, seed=42, samples=None, group='placement'):
+    """
+    (train, val) filename lists with every group (object placement by default, or
+    'workbook') entirely on one side; about test_size of the samples go to val.
+    """
+    samples = range(len(index['samples'])) if samples is None else samples
+    entries = [index['samples'][i] for i in samples]
+    groups = np.array([entry[group] for entry in entries])
+    unique, counts = np.unique(groups, return_counts=True)
+    target = test_size * len(entries)
+    taken, size = [], 0
+    for g in np.random.default_rng(seed).permutation(len(unique)):   # greedy fill, skipping groups that overshoot
+        if size + counts[g] <= target:
+            taken.append(g)
+            size += counts[g]
+    if not taken:   # every group is larger than the target: the smallest one
+        taken = [int(np.argmin(counts))]
+    val_groups = set(unique[taken].tolist())
+    train = [e['file'] for e, g in zip(entries, groups) if g not in val_groups]
+    val = [e['file'] for e, g in zip(entries, groups) if g in val_groups]
+    if not train or not val:
+        raise ValueError(f"Split by {group} leaves {len(train)} train / {len(val)} val samples; "
+                         f"need at least 2 groups and 0 < test_size < 1")
+    return train, val
+
+
+def leakage(index, train, val, key='placement'):
+    """Number of val samples whose group (or image hash, key='image_hash') also appears in train."""
+    by_file = {s['file']: s for s in index['samples']}
+    seen = {by_file[f][key] for f in train}
+    return sum(by_file[f][key] in seen for f in val)
+
+
+# --- BUILD + REPORT ---
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = build_index()
+    samples = index['samples']
+    elapsed = time.perf_counter() - start
+    exact = sum(s['duplicate_of'] != i for i, s in enumerate(samples))
+    kept = deduplicated(index)
+    print(f"✅ Indexed {len(samples)} pairs in {elapsed:.1f} s: {len({s['workbook'] for s in samples})} workbooks, "
+          f"{len({s['placement'] for s in samples})} placements, {exact} exact duplicates, "
+          f"{len(samples) - len(kept)} near duplicates (RMS < {NEAR_DUPLICATE_RMS})")
+
+    rng = np.random.default_rng(42)
+    files = [s['file'] for s in samples]
+    shuffled = rng.permutation(len(files))
+    random_val = [files[i] for i in shuffled[:len(files) // 5]]
+    random_train = [files[i] for i in shuffled[len(files) // 5:]]
+    train, val = grouped_split(index, samples=kept)
+    print(f"📊 Random split: {leakage(index, random_train, random_val)} of {len(random_val)} val samples share a "
+          f"placement with train; grouped + deduplicated: {leakage(index, train, val)} of {len(val)} "
+          f"({len(train)} train samples instead of {len(random_train)})")
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+
+from dataset_index import deduplicated, grouped_split, load_index
+from pack_dataset import IMAGE_DIR, MASK_DIR, PACK_PATH, gather_batch, iterate_batches, load_packed, pack_dataset
+
+try:
+    import tensorflow as tf
+except ImportError:   # load_split() + pack_dataset.iterate_batches still work without TensorFlow
+    tf = None
+
+# --- CONFIG ---
+AUTOTUNE = tf.data.AUTOTUNE if tf is not None else None
+
+# The pairs come from pack_dataset's uint8 memmap, decoded and resized once when the
+# folders are packed. A dataset is just the packed row numbers: shuffled (a few bytes
+# per pair), batched, and each batch gathered from the memmap in a parallel
+# numpy_function, converted to float32 and prefetched.
+
+
+def split_files(image_dir=IMAGE_DIR, mask_dir=MASK_DIR, test_size=0.2, seed=42, dedup=True, group='placement'):
+    """
+    (train, val) lists of filenames present in both folders. Whole groups (object
+    placement, or group='workbook') go to one side so frames of one recording never
+    leak into val; dedup drops near-duplicate frames first (see dataset_index).
+    """
+    index = load_index(image_dir, mask_dir)
+    samples = deduplicated(index) if dedup else None
+    return grouped_split(index, test_size=test_size, seed=seed, samples=samples, group=group)
+
+
+def load_split(files, img_size, image_dir=IMAGE_DIR, mask_dir=MASK_DIR, pack_path=PACK_PATH):
+    """(images, masks, rows): the packed uint8 memmaps and the packed rows of files."""
+    images, masks, packed_files = load_packed(pack_path, img_size, image_dir, mask_dir)
+    if not set(files) <= set(packed_files):   # PNGs added since the folders were packed
+        pack_dataset(image_dir, mask_dir, pack_path, img_size)
+        images, masks, packed_files = load_packed(pack_path, img_size, image_dir, mask_dir)
+    row_of = {name: i for i, name in enumerate(packed_files)}
+    return images, masks, np.array([row_of[name] for name in files], dtype=np.int64)
+
+
+def make_dataset(files, img_size, batch_size, threshold=0.3, shuffle=True, image_dir=IMAGE_DIR, mask_dir=MASK_DIR,
+                 seed=42, pack_path=PACK_PATH):
+    """Streaming (x, y) float32 batches for model.fit, gathered from the packed memmap."""
+    if not files:
+        raise ValueError("No image/mask pairs for this dataset")
+    images, masks, rows = load_split(files, img_size, image_dir, mask_dir, pack_path)
+
+    def gather(batch):
+        return gather_batch(images, masks, batch, threshold)
+
+    def to_tensors(batch):
+        x, y = tf.numpy_function(gather, [batch], (tf.float32, tf.float32))
+        x.set_shape((None, img_size, img_size, 1))
+        y.set_shape((None, img_size, img_size, 1))
+        return x, y
+
+    ds = tf.data.Dataset.from_tensor_slices(rows)
+    if shuffle:
+        ds = ds.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(to_tensors, num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+# --- TIME ONE PASS ---
+if __name__ == "__main__":
+    train_files, _ = split_files()
+    if tf is None:
+        images, masks, rows = load_split(train_files, 384)
+        batches = iterate_batches(images, masks, rows, batch_size=16)
+        start = time.perf_counter()
+        for _ in range((len(rows) + 15) // 16):
+            next(batches)
+        print(f"✅ numpy epoch of {len(rows)} pairs in {time.perf_counter() - start:.2f} s (TensorFlow not installed)")
+    else:
+        dataset = make_dataset(train_files, img_size=384, batch_size=16)
+        for epoch in range(2):
+            start = time.perf_counter()
+            batches = sum(1 for _ in dataset)
+            print(f"✅ Epoch {epoch + 1}: {batches} batches of {len(train_files)} pairs in "
+                  f"{time.perf_counter() - start:.2f} s")
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+# --- CONFIG ---
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(HERE, '..', 'dataset', 'image_mask_data', 'Image')
+MASK_DIR = os.path.join(HERE, '..', 'dataset', 'image_mask_data', 'mask')
+PACK_PATH = os.path.join(HERE, 'packed_dataset')   # writes packed_dataset_<size>.npy + .json
+IMG_SIZE = 128
+PACK_VERSION = 2
+
+# Packed layout: one uint8 .npy memmap of shape (N, 2, IMG_SIZE, IMG_SIZE); [:, 0] is the
+# grayscale input, [:, 1] the mask (mean of its RGB channels, as load_masks did). Both
+# are resized with nearest-neighbour like keras load_img. Mask > 0.3 on the old float
+# scale is exactly mask >= 77 on the packed bytes, so binarizing loses nothing.
+
+
+def save_json(path, data):
+    """Write data as JSON to path atomically: readers see the old or the new file, never half of one."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def pack_paths(path=PACK_PATH, img_size=IMG_SIZE):
+    base = f'{path}_{img_size}'
+    return base + '.npy', base + '.json'
+
+
+def _load_gray(path, img_size, rgb_mean=False):
+    img = Image.open(path)
+    if rgb_mean:
+        img = img.convert('RGB').resize((img_size, img_size), Image.NEAREST)
+        return np.round(np.asarray(img, dtype=np.float32).mean(axis=-1)).astype(np.uint8)
+    return np.asarray(img.convert('L').resize((img_size, img_size), Image.NEAREST), dtype=np.uint8)
+
+
+def pack_dataset(image_dir=IMAGE_DIR, mask_dir=MASK_DIR, path=PACK_PATH, img_size=IMG_SIZE):
+    """Decode + resize every image/mask pair once into the packed uint8 file; returns the file count."""
+    files = sorted(os.listdir(image_dir))
+    masks = sorted(os.listdir(mask_dir))
+    if files != masks:
+        missing = sorted(set(files) ^ set(masks))
+        raise ValueError(f"{len(missing)} files without an image/mask partner, e.g. {missing[:3]}")
+
+    data_path, index_path = pack_paths(path, img_size)
+    packed = np.lib.format.open_memmap(data_path + '.tmp.npy', mode='w+', dtype=np.uint8,
+                                       shape=(len(files), 2, img_size, img_size))
+    for i, name in enumerate(files):
+        packed[i, 0] = _load_gray(os.path.join(image_dir, name), img_size)
+        packed[i, 1] = _load_gray(os.path.join(mask_dir, name), img_size, rgb_mean=True)
+    packed.flush()
+    del packed
+    os.replace(data_path + '.tmp.npy', data_path)
+    save_json(index_path, {'version': PACK_VERSION, 'img_size': img_size, 'count': len(files), 'files': files,
+                           'image_dir': os.path.abspath(image_dir), 'mask_dir': os.path.abspath(mask_dir)})
+    return len(files)
+
+
+def load_packed(path=PACK_PATH, img_size=IMG_SIZE, image_dir=IMAGE_DIR, mask_dir=MASK_DIR):
+    """
+    Lazily mapped (images, masks, files): images and masks are uint8 (N, size, size, 1)
+    views of the packed file. Packs the PNG folders first if there is no packed file yet
+    or it was packed from other folders.
+    """
+    data_path, index_path = pack_paths(path, img_size)
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+    if index is None or index.get('version') != PACK_VERSION or \
+            (index['image_dir'], index['mask_dir']) != (os.path.abspath(image_dir), os.path.abspath(mask_dir)):
+        print(f"📦 Packing {image_dir} at {img_size}x{img_size}...")
+        pack_dataset(image_dir, mask_dir, path, img_size)
+        with open(index_path) as f:
+            index = json.load(f)
+    packed = np.load(data_path, mmap_mode='r')
+    return packed[:, 0, :, :, None], packed[:, 1, :, :, None], index['files']
+
+
+def gather_batch(images, masks, batch, threshold=0.3):
+    """(x, y) float32 for the given rows: x / 255, y binarized at threshold."""
+    batch = np.sort(batch)   # sorted reads are sequential in the file
+    return images[batch].astype(np.float32) / 255.0, (masks[batch] > threshold * 255).astype(np.float32)
+
+
+def iterate_batches(images, masks, indices, batch_size, threshold=0.3, shuffle=True, seed=None):
+    """
+    Endless (x, y) float32 batches for model.fit: only the batch being served is
+    converted from the packed uint8 arrays (x / 255, y binarized at threshold).
+    """
+    rng = np.random.default_rng(seed)
+    indices = np.asarray(indices)
+    while True:
+        order = rng.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            yield gather_batch(images, masks, order[start:start + batch_size], threshold)
+
+
+# --- PACK + TIME A LAZY LOAD ---
+if __name__ == "__main__":
+    for size in (128, 384):
+        start = time.perf_counter()
+        count = pack_dataset(img_size=size)
+        packed_time = time.perf_counter() - start
+        start = time.perf_counter()
+        images, masks, files = load_packed(img_size=size)
+        print(f"✅ {count} pairs at {size}x{size}: packed in {packed_time:.1f} s, mapped in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms, {2 * images.nbytes / 2 ** 20:.0f} MB uint8 "
+              f"(float32 arrays: {8 * images.nbytes / 2 ** 20:.0f} MB)")
@@ -1,71 +1,43 @@
-import os
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
 from tensorflow.keras.callbacks import ModelCheckpoint
-from sklearn.model_selection import train_test_split
 from tensorflow.keras.metrics import MeanIoU
-from tensorflow.keras.utils import load_img, img_to_array
 import matplotlib.pyplot as plt
 
+from input_pipeline import make_dataset, split_files
+from pack_dataset import IMAGE_DIR, MASK_DIR
+
 # --- CONFIG ---
 IMG_SIZE = 128
-INPUT_PATH = 'X'
-TARGET_PATH = 'Y'
+INPUT_PATH = IMAGE_DIR
+TARGET_PATH = MASK_DIR
+MASK_THRESHOLD = 0.3
 BATCH_SIZE = 8
 EPOCHS = 50
 MODEL_SAVE_PATH = 'best_model.h5'
 
-# --- LOAD INPUT IMAGES (grayscale) ---
-def load_input_images(folder):
-    files = sorted(os.listdir(folder))
-    data = [img_to_array(load_img(os.path.join(folder, f), color_mode='grayscale', target_size=(IMG_SIZE, IMG_SIZE))) / 255.0 for f in files]
-    return np.array(data)
-
-# --- LOAD MASKS (convert RGB to grayscale manually) ---
-def load_masks(folder):
-    files = sorted(os.listdir(folder))
-    data = []
-    for f in files:
-        img = load_img(os.path.join(folder, f), color_mode='rgb', target_size=(IMG_SIZE, IMG_SIZE))
-        arr = img_to_array(img) / 255.0  # RGB normalized
-        gray = np.mean(arr, axis=-1, keepdims=True)  # convert to grayscale
-        data.append(gray)
-    return np.array(data)
-
-# --- LOAD DATA ---
-print("Loading dataset...")
-X = load_input_images(INPUT_PATH)
-Y = load_masks(TARGET_PATH)
-
-# --- DEBUG IMAGE LOADING ---
-print("Input shape:", X.shape)
-print("Mask shape:", Y.shape)
-print("Mask value range:", Y.min(), "to", Y.max())
+# --- INPUT PIPELINE (streaming tf.data batches gathered from the packed uint8 memmap) ---
+print("Building input pipeline...")
+train_files, val_files = split_files(INPUT_PATH, TARGET_PATH, test_size=0.2, seed=42)
+train_ds = make_dataset(train_files, IMG_SIZE, BATCH_SIZE, MASK_THRESHOLD, shuffle=True,
+                        image_dir=INPUT_PATH, mask_dir=TARGET_PATH)
+val_ds = make_dataset(val_files, IMG_SIZE, BATCH_SIZE, MASK_THRESHOLD, shuffle=False,
+                      image_dir=INPUT_PATH, mask_dir=TARGET_PATH)
+print(f"Train pairs: {len(train_files)}, validation pairs: {len(val_files)}")
 
 # --- VISUAL DEBUG ---
+x_sample, y_sample = next(iter(val_ds))
 plt.figure(figsize=(10, 5))
 plt.subplot(1, 2, 1)
 plt.title("Sample Input")
-plt.imshow(X[0].squeeze(), cmap='gray')
+plt.imshow(x_sample[0].numpy().squeeze(), cmap='gray')
 plt.subplot(1, 2, 2)
-plt.title("Sample Mask (Raw Grayscale)")
-plt.imshow(Y[0].squeeze(), cmap='gray')
+plt.title("Sample Mask (Binarized)")
+plt.imshow(y_sample[0].numpy().squeeze(), cmap='gray')
 plt.tight_layout()
 plt.show()
 
-# --- BINARIZE MASKS ---
-# Y = (Y > 0.2).astype(np.float32)
-# --- BINARIZE + INVERT MASKS ---
-# Y = (Y > 0.2).astype(np.float32)
-# Y = 1.0 - Y  # <-- Invert: black pixels become 1.0 (foreground)
-Y = (Y > 0.3).astype(np.float32)  
-
-
-
-# --- SPLIT TRAIN/VAL ---
-x_train, x_val, y_train, y_val = train_test_split(X, Y, test_size=0.2, random_state=42)
-
 # --- DICE METRIC + LOSS ---
 def dice_coef(y_true, y_pred, smooth=1):
     y_true_f = tf.reshape(y_true, [-1])
@@ -133,18 +105,16 @@ checkpoint = ModelCheckpoint(
 
 # --- TRAIN ---
 history = model.fit(
-    x_train, y_train,
-    validation_data=(x_val, y_val),
+    train_ds,
+    validation_data=val_ds,
     epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
     callbacks=[checkpoint]
 )
 
 # --- IoU SCORE ---
 print("Evaluating IoU on validation set...")
-y_pred = model.predict(x_val)
-y_pred_bin = (y_pred > 0.5).astype(np.uint8)
-
 iou = MeanIoU(num_classes=2)
-iou.update_state(y_val, y_pred_bin)
+for x_batch, y_batch in val_ds:
+    y_pred_bin = (model.predict(x_batch, verbose=0) > 0.5).astype(np.uint8)
+    iou.update_state(y_batch, y_pred_bin)
 print(f"✅ Mean IoU on validation set: {iou.result().numpy():.4f}")
@@ -1,48 +1,39 @@
-import os
-import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
-from tensorflow.keras.callbacks import ModelCheckpoint
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.metrics import MeanIoU
-from tensorflow.keras.utils import load_img, img_to_array
+
+from input_pipeline import make_dataset, split_files
 
 # --- CONFIG ---
 IMG_SIZE = 384
 INPUT_PATH = 'train_data\X'
 TARGET_PATH = 'train_data\Y'
 BATCH_SIZE = 16
+MASK_THRESHOLD = 0.5
 EPOCHS = 50
 MODEL_SAVE_PATH = 'best_model.h5'
 
-# --- LOAD IMAGES ---
-def load_images(folder):
-    files = sorted(os.listdir(folder))
-    data = [img_to_array(load_img(os.path.join(folder, f), color_mode='grayscale', target_size=(IMG_SIZE, IMG_SIZE))) / 255.0 for f in files]
-    return np.array(data)
+# --- INPUT PIPELINE (streaming tf.data batches gathered from the packed uint8 memmap) ---
+print("Building input pipeline...")
+train_files, val_files = split_files(INPUT_PATH, TARGET_PATH, test_size=0.2, seed=42)
+train_ds = make_dataset(train_files, IMG_SIZE, BATCH_SIZE, MASK_THRESHOLD, shuffle=True,
+                        image_dir=INPUT_PATH, mask_dir=TARGET_PATH)
+val_ds = make_dataset(val_files, IMG_SIZE, BATCH_SIZE, MASK_THRESHOLD, shuffle=False,
+                      image_dir=INPUT_PATH, mask_dir=TARGET_PATH)
+print(f"Train pairs: {len(train_files)}, validation pairs: {len(val_files)}")
 
-print("Loading dataset...")
-X = load_images(INPUT_PATH)
-Y = load_images(TARGET_PATH)
 # --- Visual debug (optional but highly recommended) ---
 import matplotlib.pyplot as plt
 
+x_sample, y_sample = next(iter(val_ds))
 plt.figure(figsize=(10, 5))
-
 plt.subplot(1, 2, 1)
-plt.title("Input Example")
-plt.imshow(X[0].squeeze(), cmap='gray')
-
+plt.title("Sample Input")
+plt.imshow(x_sample[0].numpy().squeeze(), cmap='gray')
 plt.subplot(1, 2, 2)
-plt.title("Mask Example (Raw before binarization)")
-plt.imshow(Y[0].squeeze(), cmap='gray')
-
+plt.title("Sample Mask (Binarized)")
+plt.imshow(y_sample[0].numpy().squeeze(), cmap='gray')
 plt.tight_layout()
 plt.show()
-Y = (Y > 0.5).astype(np.float32)  # binarize if it's mask
-
-# --- TRAIN/VAL SPLIT ---
-x_train, x_val, y_train, y_val = train_test_split(X, Y, test_size=0.2, random_state=42)
 
 # --- DICE METRIC ---
 def dice_coef(y_true, y_pred, smooth=1):
@@ -91,15 +82,14 @@ def mini_unet(input_shape=(IMG_SIZE, IMG_SIZE, 1)):
 
 # --- TRAIN ---
 # history = model.fit(
-#     x_train, y_train,
-#     validation_data=(x_val, y_val),
+#     train_ds,
+#     validation_data=val_ds,
 #     epochs=EPOCHS,
-#     batch_size=BATCH_SIZE,
 #     callbacks=[checkpoint]
 # )
 
 # # --- IoU on validation ---
-# y_pred = model.predict(x_val) > 0.5
 # iou = MeanIoU(num_classes=2)
-# iou.update_state(y_val, y_pred)
+# for x_batch, y_batch in val_ds:
+#     iou.update_state(y_batch, model.predict(x_batch, verbose=0) > 0.5)
 # print(f"Mean IoU on validation set: {iou.result().numpy():.4f}")